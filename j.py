@@ -1,6 +1,11 @@
 import speech_recognition as sr
 import pyttsx3
-import wikipedia
+from jarvis.cache import SummaryCache
+from jarvis.intents import SEARCH_PHRASES, IntentRegistry
+
+summary_cache = SummaryCache()
+intents = IntentRegistry()
+intents.register("search", SEARCH_PHRASES, None)
 
 def listen():
     recognizer = sr.Recognizer()
@@ -21,10 +26,11 @@ def speak(text):
     engine.runAndWait()
 
 def process_command(command):
-    if "search" in command.lower():
-        query = command.lower().replace("search", "").strip()
+    match = intents.match(command)
+    if match is not None:
+        query = match.slots["query"]
         try:
-            result = wikipedia.summary(query, sentences=2)
+            result = summary_cache.summary(query, sentences=2)
             return result
         except:
             return "Sorry, I couldn't find information about that."
@@ -0,0 +1,3 @@
+from .assistant import Assistant
+from .config import AssistantConfig
+from .gui import AssistantGUI, run
@@ -0,0 +1,309 @@
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import tracing
+from .cache import SummaryCache
+from .executor import Cancelled, CommandExecutor
+from .gate import KeywordSpotter, SpeakingTracker, SpeechGate
+from .intents import EXIT_PHRASES, SEARCH_PHRASES, STOP_PHRASES, IntentRegistry
+from .lazy import warm_up
+from .nbest import rank_hypotheses, search_queries
+from .speech import SpeechRecognitionThread
+from .speech_queue import ANSWER, STATUS, URGENT, SpeechQueue
+from .streaming import stream_sentences
+from .translation import PROMPTS, TranslationService, placeholders
+from .tts import TextToSpeechThread
+from .wiki import DisambiguationError, PageError, SuggestedTitle
+
+
+def make_summary_cache(config):
+    # Answers from the offline knowledge index first when there is one
+    path = config.knowledge_index or os.environ.get("JARVIS_KNOWLEDGE")
+    if path:
+        # Imported here so `python -m jarvis.knowledge` doesn't find itself already loaded
+        from .knowledge import KnowledgeClient, KnowledgeIndex
+        return SummaryCache(client=KnowledgeClient(KnowledgeIndex(path)))
+    return SummaryCache()
+
+
+class Assistant:
+    # Everything an assistant does apart from drawing a window: intents,
+    # commands, lookups and the speech threads. AssistantGUI puts a window
+    # around it; benchmarks and servers drive it through on_text_detected().
+    # Subclasses override the hooks at the bottom to show what is going on.
+    def __init__(self, config, dispatcher=None, summary_cache=None, translator=None, workers=None):
+        self.config = config
+        # Worker processes for recognition; a pool that is passed in is shared and left running
+        self.owns_workers = workers is None
+        self.workers = workers if workers is not None else self.make_workers()
+        self.dispatcher = dispatcher
+        self.executor = CommandExecutor(dispatcher)
+        self.speech_queue = SpeechQueue()
+        self.summary_cache = summary_cache or make_summary_cache(config)
+        self.query_corrector = self.make_query_corrector()
+        # Looks up the alternative search queries of one phrase side by side
+        self.lookups = ThreadPoolExecutor(max_workers=max(config.alternatives, 1), thread_name_prefix="alternatives")
+        if translator is None and config.translate:
+            translator = TranslationService(on_warm=self.prerender_prompts)
+        self.translator = translator
+
+        self.intents = IntentRegistry()
+        self.intents.register("exit", EXIT_PHRASES, self.exit_command)
+        self.intents.register("search", SEARCH_PHRASES, self.search_command)
+        if config.voice_stop_command:
+            self.intents.register("stop", STOP_PHRASES, self.stop_command)
+        # Plugins get the assistant and can register their own intents
+        for plugin in config.plugins:
+            plugin(self)
+
+        # Load the heavy dependencies in parallel while the window comes up
+        warm_up(*config.dependencies())
+        # Told by the speech thread when the assistant is talking, so the gate can drop its echo
+        self.speaking = SpeakingTracker()
+        self.speech_gate = self.make_speech_gate()
+        self.tts_thread = self.make_speech_output()
+        self.tts_thread.start()
+        if config.cache_speech:
+            self.prerender_prompts('en', PROMPTS + [config.unknown_command, "Stopping current action."])
+            if self.translator is not None:
+                self.translator.warm(*config.prerender_languages)
+
+        self.speech_thread = None
+
+    def make_workers(self):
+        if self.config.processes == 0:
+            return None
+        from .workers import WorkerPool
+        config = self.config
+        return WorkerPool(config.recognizer_language, config.processes, config.compress_audio, config.detect_language)
+
+    def make_speech_gate(self):
+        config = self.config
+        echo_suppression = config.suppresses_echo()
+        if not config.keyword_gate and not echo_suppression:
+            return None
+        if self.workers is not None:
+            spot = functools.partial(self.workers.spot, keywords=config.keywords)
+        else:
+            spot = KeywordSpotter(config.keywords).spot
+        return SpeechGate(spot, self.speaking if echo_suppression else None, config.keyword_gate)
+
+    def make_query_corrector(self):
+        path = self.config.title_index or os.environ.get("JARVIS_TITLES")
+        if path:
+            from .titles import QueryCorrector, TitleIndex
+            return QueryCorrector(TitleIndex(path))
+        return None
+
+    def start_listening(self):
+        self.speech_thread = self.make_speech_input()
+        self.speech_thread.start()
+        self.say("Listening started. How can I help you?", 'en', STATUS, key="listening")
+
+    def stop_listening(self):
+        self.speech_thread.stop()
+        self.speech_thread = None
+        self.say("Listening stopped.", 'en', STATUS, key="listening")
+
+    def on_text_detected(self, text, language, alternatives=None):
+        # Runs on a recognition worker; anything slow goes to the command executor.
+        # alternatives are the recognizer's (transcript, confidence) guesses, best first.
+        with tracing.span("intent"):
+            hypotheses = rank_hypotheses(alternatives or [(text, None)], self.intents,
+                                         functools.partial(self.known_query, language=language))
+        best = hypotheses[0] if hypotheses else None
+        self.show(f"You: {best.text if best else text}")
+        if best is not None and best.match is not None:
+            # A command starts a new turn, so whatever was still being said is
+            # cut off. Anything else may be the room, or the assistant's own
+            # echo, and must not silence the answer.
+            self.speech_queue.barge_in(tracing.current_turn())
+        if best is None or best.match is None:
+            self.executor.submit("reply", self.reply, self.config.unknown_command, language,
+                                 on_result=self.command_finished, on_error=self.command_failed)
+        elif best.query is not None and best.match.intent.handler == self.search_command:
+            # The other searches are tried too in case this one finds nothing
+            queries = search_queries(hypotheses, self.config.alternatives)
+            self.search_command(language, queries[0], alternatives=queries[1:])
+        else:
+            best.match.intent.handler(language, **best.match.slots)
+
+    def known_query(self, query, language='en'):
+        # Whether a search in the language could be answered without asking the wiki
+        wiki_language = language if self.config.native_wiki else 'en'
+        if self.summary_cache.known(query, language=wiki_language):
+            return True
+        return self.query_corrector is not None and self.query_corrector.known(query, wiki_language)
+
+    def exit_command(self, language):
+        self.call(self.quit)
+
+    def search_command(self, language, query, alternatives=()):
+        self.call(self.busy_changed, True)
+        self.executor.submit("search", self.search, query, language, alternatives, timeout=self.config.command_timeout,
+                             on_result=self.command_finished, on_error=self.command_failed)
+
+    def stop_command(self, language):
+        self.executor.cancel_all()
+        self.speech_queue.clear()
+        self.say("Stopping current action.", 'en', URGENT)
+
+    def search(self, handle, query, language, alternatives=()):
+        search_message = self.prompt("Searching for '{query}'...", language, query=query)
+        handle.check()
+        # Not worth saying any more once the answer is ready
+        self.say(search_message, language, STATUS, key="status", ttl=10)
+        with tracing.span("wiki"):
+            if alternatives:
+                result, result_language = self.first_answer([query, *alternatives], language, handle)
+            else:
+                result, result_language = self.get_wikipedia_summary(query, language)
+        # Answers from the English wiki still need translating
+        translate_many = None
+        if self.translator is not None and result_language != language:
+            translate_many = self.translate_many
+        for sentence in stream_sentences(result, language, translate_many):
+            handle.check()
+            self.say(sentence, language, supersedes="status")
+
+    def reply(self, handle, message, language):
+        response = self.prompt(message, language)
+        handle.check()
+        self.say(response, language)
+
+    def command_finished(self, result):
+        if not self.executor.busy():
+            self.busy_changed(False)
+
+    def command_failed(self, error):
+        if not isinstance(error, Cancelled):
+            print(f"Command failed; {error}")
+        self.command_finished(None)
+
+    def stop_processing(self):
+        self.executor.cancel_all()
+        self.speech_queue.clear()
+        self.busy_changed(False)
+        self.say("Processing stopped.", 'en', URGENT)
+
+    def get_wikipedia_summary(self, query, language):
+        # Returns the answer and the language it is in
+        try:
+            return self.find_summary(query, language)
+        except Exception as e:
+            return self.failure_message(e, query, language), language
+
+    def first_answer(self, queries, language, handle):
+        # Looks all the queries up at once and answers with the first one, in
+        # order, that finds an article; the lookups still running are then
+        # abandoned. If none does, the first query's failure is reported.
+        cancelled = threading.Event()
+        futures = [self.lookups.submit(self.find_summary, query, language, cancelled) for query in queries]
+        try:
+            for query, future in zip(queries, futures):
+                try:
+                    answer = future.result()
+                except Exception:
+                    handle.check()
+                    continue
+                if query != queries[0]:
+                    print(f"Answering '{query}' instead of '{queries[0]}'")
+                return answer
+        finally:
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+        try:
+            futures[0].result()
+        except Exception as e:
+            return self.failure_message(e, queries[0], language), language
+
+    def find_summary(self, query, language, cancelled=None):
+        # Returns the summary and the language it is in; raises the wiki's
+        # errors, or SuggestedTitle when the query is only close to a title
+        wiki_language = language if self.config.native_wiki else 'en'
+        if self.query_corrector is not None and wiki_language == language:
+            # Misheard titles are fixed here instead of costing a PageError from the wiki
+            with tracing.span("titles"):
+                corrected, suggestion = self.query_corrector.resolve(query, language)
+            if suggestion is not None:
+                raise SuggestedTitle(query, suggestion)
+            query = corrected
+        if self.config.native_wiki and language != 'en':
+            return self.summary_cache.lookup(query, language, sentences=2, cancelled=cancelled)
+        return self.summary_cache.summary(query, sentences=2, cancelled=cancelled), 'en'
+
+    def failure_message(self, error, query, language):
+        if isinstance(error, SuggestedTitle):
+            return self.prompt("Did you mean '{title}'?", language, title=error.suggestion)
+        if isinstance(error, DisambiguationError):
+            options = error.options[:5]  # Limit to first 5 options
+            return self.prompt("There are multiple results for '{query}'. Possible matches: {options}. Please be more specific.",
+                               language, query=query, options=', '.join(options))
+        if isinstance(error, PageError):
+            return self.prompt("Sorry, I couldn't find any information about '{query}'.", language, query=query)
+        return self.prompt("An error occurred while searching: {error}", language, error=str(error))
+
+    def prompt(self, template, language, **fields):
+        if self.translator is None:
+            return template.format(**fields)
+        with tracing.span("prompt"):
+            return self.translator.prompt(template, language, **fields)
+
+    def translate_many(self, texts, language):
+        with tracing.span("translate"):
+            return self.translator.translate_many(texts, language)
+
+    def prerender_prompts(self, language, prompts):
+        # Only prompts without fields can be spoken exactly as rendered
+        if self.config.cache_speech:
+            self.tts_thread.prerender(dict.fromkeys(p for p in prompts if not placeholders(p)), language)
+
+    def say(self, text, language, priority=ANSWER, **options):
+        # options are passed on to SpeechQueue.put(): key, ttl, supersedes
+        self.show(f"Assistant: {text}")
+        self.speech_queue.put(text, language, tracing.current_turn(), priority, **options)
+
+    def call(self, fn, *args, **kwargs):
+        # Runs fn on the dispatcher's thread if there is one
+        if self.dispatcher is not None:
+            self.dispatcher.call(fn, *args, **kwargs)
+        else:
+            fn(*args, **kwargs)
+
+    def shutdown(self):
+        if self.speech_thread is not None:
+            self.speech_thread.stop()
+            self.speech_thread = None
+        self.tts_thread.stop()
+        self.executor.shutdown()
+        self.lookups.shutdown(wait=False, cancel_futures=True)
+        if self.workers is not None and self.owns_workers:
+            self.workers.close()
+
+    # Hooks
+
+    def make_speech_input(self):
+        # The thread that hands recognized speech to on_text_detected
+        config = self.config
+        return SpeechRecognitionThread(self.on_text_detected, config.recognizer_language, config.detect_language,
+                                       config.phrase_time_limit, config.calibration, pool=self.workers,
+                                       compress=config.compress_audio, gate=self.speech_gate)
+
+    def make_speech_output(self):
+        # The thread that speaks what is put on speech_queue
+        return TextToSpeechThread(self.speech_queue, switch_voices=self.config.detect_language,
+                                  cache_audio=self.config.cache_speech, speaking=self.speaking)
+
+    def show(self, text):
+        # A line of the conversation; may be called from any thread
+        pass
+
+    def busy_changed(self, busy):
+        # Whether commands are running; called on the dispatcher's thread
+        pass
+
+    def quit(self):
+        self.shutdown()
@@ -0,0 +1,138 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import wave
+from collections import OrderedDict
+
+from .cache import CACHE_DIR
+from .lazy import lazy_import
+
+pyaudio = lazy_import("pyaudio")
+
+
+class AudioClip:
+    def __init__(self, frames, sample_rate, sample_width, channels):
+        self.frames = frames
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+
+    @classmethod
+    def from_wav(cls, data):
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            return cls(wav.readframes(wav.getnframes()), wav.getframerate(), wav.getsampwidth(), wav.getnchannels())
+
+    def duration(self):
+        return len(self.frames) / (self.sample_rate * self.sample_width * self.channels)
+
+
+class AudioCache:
+    # Rendered speech keyed by (text, voice, rate). Clips are kept as .wav
+    # files in a directory, and the most recently used ones are also held in
+    # memory, up to memory_bytes of audio. The directory is trimmed back to
+    # disk_bytes, least recently used first.
+    def __init__(self, directory=None, memory_bytes=32 * 1024 * 1024, disk_bytes=256 * 1024 * 1024):
+        self.directory = directory or os.path.join(CACHE_DIR, "speech")
+        os.makedirs(self.directory, exist_ok=True)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.memory = OrderedDict()
+        self.memory_used = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text, voice, rate):
+        return hashlib.sha1(json.dumps([text, voice, rate]).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".wav")
+
+    def get(self, key):
+        with self.lock:
+            clip = self.memory.get(key)
+            if clip is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return clip
+        try:
+            with open(self.path(key), "rb") as f:
+                clip = AudioClip.from_wav(f.read())
+            os.utime(self.path(key))
+        except (OSError, EOFError, wave.Error):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+            self._remember(key, clip)
+        return clip
+
+    def store(self, key, rendered_path):
+        # Takes ownership of a freshly rendered .wav file
+        with open(rendered_path, "rb") as f:
+            clip = AudioClip.from_wav(f.read())
+        os.replace(rendered_path, self.path(key))
+        with self.lock:
+            self._remember(key, clip)
+        self._trim()
+        return clip
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_bytes": self.memory_used,
+            }
+
+    def _remember(self, key, clip):
+        if key in self.memory:
+            self.memory_used -= len(self.memory.pop(key).frames)
+        self.memory[key] = clip
+        self.memory_used += len(clip.frames)
+        while self.memory_used > self.memory_bytes and len(self.memory) > 1:
+            self.memory_used -= len(self.memory.popitem(last=False)[1].frames)
+
+    def _trim(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".wav"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+class WavPlayer:
+    # Plays AudioClips straight to the default output device
+    def __init__(self):
+        self.audio = pyaudio.PyAudio()
+
+    def play(self, clip, interrupted=None):
+        # Written in short chunks so interrupted() can cut playback off quickly
+        stream = self.audio.open(format=self.audio.get_format_from_width(clip.sample_width),
+                                 channels=clip.channels, rate=clip.sample_rate, output=True)
+        chunk = int(clip.sample_rate * 0.05) * clip.sample_width * clip.channels
+        try:
+            for start in range(0, len(clip.frames), chunk):
+                if interrupted is not None and interrupted():
+                    break
+                stream.write(clip.frames[start:start + chunk])
+        finally:
+            stream.stop_stream()
+            stream.close()
+
+    def close(self):
+        self.audio.terminate()
@@ -0,0 +1,56 @@
+# Measures intent dispatch latency as the number of registered intents grows.
+#
+#   python -m jarvis.bench_intents --sizes 10 100 1000
+import argparse
+import random
+import time
+
+from .intents import EXIT_PHRASES, SEARCH_PHRASES, STOP_PHRASES, IntentRegistry
+
+UTTERANCES = [
+    "search albert einstein",
+    "please search for the eiffel tower",
+    "buscar gatos",
+    "stop",
+    "exit",
+    "research stop words",
+    "what time is it in tokyo",
+    "turn on the kitchen lights",
+]
+
+VERBS = ["turn on", "turn off", "open", "close", "play", "pause", "show", "set", "remind me to", "tell me about"]
+
+
+def build_registry(size):
+    registry = IntentRegistry()
+    registry.register("exit", EXIT_PHRASES, None)
+    registry.register("search", SEARCH_PHRASES, None)
+    registry.register("stop", STOP_PHRASES, None)
+    random.seed(size)
+    for number in range(size):
+        verb = random.choice(VERBS)
+        registry.register(f"intent{number}", [f"{verb} thing{number} {{target}}", f"thing{number} {{target}} please"], None)
+    return registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent dispatch micro-benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        registry = build_registry(size)
+        started = time.perf_counter()
+        registry.match("warm up")  # compiles the matcher
+        compile_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for number in range(args.iterations):
+            registry.match(UTTERANCES[number % len(UTTERANCES)])
+        per_match = (time.perf_counter() - started) / args.iterations
+        print(f"{size:6d} extra intents: compile {compile_time * 1000:.1f} ms, dispatch {per_match * 1e6:.1f} us/utterance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+# Drives the whole assistant pipeline of j1-j5 without a microphone,
+# speakers, display or network, and checks the results against stored
+# baselines. Utterances from a weighted query mix go through intent
+# matching, the command executor, the wiki and translation clients (talking
+# to a local stand-in server) and into a speech sink that only waits.
+#
+#   python -m jarvis.bench_pipeline j1.py j3.py --turns 200
+#   python -m jarvis.bench_pipeline j4.py --audio fixtures/   # .wav files with .txt transcripts
+#   python -m jarvis.bench_pipeline j1.py j2.py j3.py j4.py j5.py --update-baseline
+#
+# Exits with status 1 when a result is worse than its baseline by more than --tolerance.
+import argparse
+import gc
+import http.server
+import json
+import os
+import random
+import runpy
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+
+from . import tracing
+from .assistant import Assistant
+from .cache import SummaryCache
+from .recognizers import BACKENDS, RecognizerBackend
+from .streaming import split_sentences
+from .translation import GoogleTranslateClient, TranslationService
+from .transport import Transport
+from .wiki import WikiClient
+
+# Checked in so every checkout compares against the same figures
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# weight, spoken language, utterance; {topic} is filled with a random entry of TOPICS
+MIX = [
+    (6, "en", "search {topic}"),
+    (3, "en", "search for albert einstein"),
+    (2, "en", "please look up the eiffel tower"),
+    (2, "en", "search mercury"),
+    (1, "en", "search zzyzx quorblat"),
+    (1, "en", "what time is it in tokyo"),
+    (3, "es", "buscar {topic}"),
+    (2, "fr", "chercher la tour eiffel"),
+    (2, "de", "suche nach {topic}"),
+]
+
+TOPICS = [
+    "ada lovelace", "alan turing", "marie curie", "isaac newton", "nikola tesla", "grace hopper",
+    "the moon", "mount everest", "the amazon river", "the great wall of china", "photosynthesis",
+    "black holes", "the roman empire", "jazz", "chess", "volcanoes", "honey bees", "the printing press",
+    "penguins", "the pacific ocean", "quantum computing", "the internet", "coffee", "the olympic games",
+]
+
+DISAMBIGUATION = {"mercury": ["Mercury (planet)", "Mercury (element)", "Freddie Mercury", "Mercury (mythology)"]}
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    # Answers the MediaWiki API calls WikiClient makes and the web translate
+    # endpoint GoogleTranslateClient uses, after the configured delay
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        if url.path.endswith("/w/api.php"):
+            time.sleep(self.server.wiki_latency)
+            body = self.wiki(params)
+        elif url.path == "/translate":
+            time.sleep(self.server.translate_latency)
+            body = self.translate(params)
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def wiki(self, params):
+        if params.get("list") == "search":
+            query = params["srsearch"].lower()
+            if "zzyzx" in query:
+                return {"query": {"search": []}}
+            return {"query": {"search": [{"title": query.title()}]}}
+        title = params["titles"]
+        if params.get("prop") == "links":
+            return {"query": {"pages": [{"title": title, "links": [{"title": link} for link in DISAMBIGUATION[title.lower()]]}]}}
+        if title.lower() in DISAMBIGUATION:
+            return {"query": {"pages": [{"title": title, "pageprops": {"disambiguation": ""}}]}}
+        extract = (f"{title} is a subject with a long and well documented history. "
+                   f"Much has been written about {title} in many languages. "
+                   f"Scholars continue to study {title} today.")
+        sentences = int(params.get("exsentences", 2))
+        return {"query": {"pages": [{"title": title, "extract": " ".join(split_sentences(extract)[:sentences])}]}}
+
+    def translate(self, params):
+        # One segment per line, the way the real endpoint splits its input
+        lines = params["q"].splitlines(keepends=True)
+        return [[[f"[{params['tl']}] {line}", line] for line in lines], None, params.get("sl", "auto")]
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, wiki_latency=0.05, translate_latency=0.03):
+        http.server.ThreadingHTTPServer.__init__(self, ("127.0.0.1", 0), StandInHandler)
+        self.wiki_latency = wiki_latency
+        self.translate_latency = translate_latency
+        self.url = f"http://127.0.0.1:{self.server_port}"
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class NullSpeechOutput(threading.Thread):
+    # Takes the place of TextToSpeechThread: every item just takes `latency`
+    # seconds plus `per_character` for each character of text, or less if
+    # it is interrupted
+    def __init__(self, speech_queue, latency=0.01, per_character=0.0005):
+        threading.Thread.__init__(self, daemon=True)
+        self.speech_queue = speech_queue
+        self.latency = latency
+        self.per_character = per_character
+        self.spoken = 0
+        self.interrupted = threading.Event()
+        speech_queue.on_interrupt = self.interrupted.set
+
+    def run(self):
+        while True:
+            item = self.speech_queue.get()
+            if item is None:
+                return
+            self.interrupted.clear()
+            with tracing.bind(item.turn):
+                tracing.record("tts_wait", time.monotonic() - item.queued)
+                tracing.responding(item.turn)
+                with tracing.span("speak"):
+                    if not item.interrupted:
+                        self.interrupted.wait(self.latency + self.per_character * len(item.text))
+            self.spoken += 1
+            self.speech_queue.task_done()
+
+    def prerender(self, texts, language):
+        pass
+
+    def stop(self):
+        self.speech_queue.close()
+
+
+class FixtureBackend(RecognizerBackend):
+    # Recognizer for --audio runs: returns the transcripts of the replayed
+    # .wav files in order, each after --recognition-latency seconds
+    transcripts = []
+    latency = 0.0
+    lock = threading.Lock()
+
+    def transcribe(self, audio):
+        time.sleep(self.latency)
+        with FixtureBackend.lock:
+            if not FixtureBackend.transcripts:
+                return [("", None)]
+            return [(FixtureBackend.transcripts.pop(0), None)]
+
+
+class BenchAssistant(Assistant):
+    def __init__(self, config, server, directory, speech_latency, per_character):
+        self.speech_latency = speech_latency
+        self.per_character = per_character
+        transport = Transport()
+        summary_cache = SummaryCache(os.path.join(directory, "summaries.db"),
+                                     client=WikiClient(server.url + "/{language}/w/api.php", transport))
+        translator = None
+        if config.translate:
+            translator = TranslationService(os.path.join(directory, "translations.db"),
+                                            translator=GoogleTranslateClient(server.url + "/translate", transport),
+                                            on_warm=self.prerender_prompts)
+        Assistant.__init__(self, config, summary_cache=summary_cache, translator=translator)
+
+    def make_speech_output(self):
+        return NullSpeechOutput(self.speech_queue, self.speech_latency, self.per_character)
+
+    def wait_idle(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while self.executor.busy():
+            if time.monotonic() > deadline:
+                raise TimeoutError("commands did not finish")
+            time.sleep(0.001)
+        self.speech_queue.join()
+
+
+def load_mix(path):
+    mix = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                weight, language, utterance = line.split(None, 2)
+                mix.append((float(weight), language, utterance))
+    return mix
+
+
+def utterances(mix, count, seed):
+    rng = random.Random(seed)
+    weights = [weight for weight, _, _ in mix]
+    for _ in range(count):
+        _, language, utterance = rng.choices(mix, weights)[0]
+        yield utterance.replace("{topic}", rng.choice(TOPICS)), language
+
+
+def percentile(samples, p):
+    return tracing.percentile(sorted(samples), p)
+
+
+def run_transcripts(assistant, config, args, mix):
+    # One turn at a time, the way a single user talks to the assistant
+    latencies = []
+    turns = list(utterances(mix, args.warmup + args.turns, args.seed))
+    for number, (text, language) in enumerate(turns):
+        if number == args.warmup:
+            gc.collect()
+            memory_start = tracemalloc.get_traced_memory()[0]
+            tracing.TRACER.reset()
+            started_all = time.perf_counter()
+        if not config.detect_language:
+            language = 'en'
+        started = time.perf_counter()
+        with tracing.bind(tracing.new_turn()):
+            assistant.on_text_detected(text, language)
+        assistant.wait_idle()
+        if number >= args.warmup:
+            latencies.append(time.perf_counter() - started)
+    elapsed = time.perf_counter() - started_all
+    gc.collect()
+    memory_growth = tracemalloc.get_traced_memory()[0] - memory_start
+    return {
+        "turns": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "memory_growth_kb": memory_growth / 1024,
+    }
+
+
+def run_audio(assistant, args):
+    # Replays the fixture directory once, as fast as it can be read
+    names = sorted(name for name in os.listdir(args.audio) if name.lower().endswith(".wav"))
+    transcripts = []
+    for name in names:
+        with open(os.path.join(args.audio, name[:-4] + ".txt"), encoding="utf-8") as f:
+            transcripts.append(f.read().strip())
+    FixtureBackend.transcripts = transcripts
+    FixtureBackend.latency = args.recognition_latency
+    os.environ.update(JARVIS_AUDIO_DIR=args.audio, JARVIS_REPLAY_SPEED="max", JARVIS_RECOGNIZER="fixture")
+
+    gc.collect()
+    memory_start = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    assistant.start_listening()
+    assistant.speech_thread.join()
+    # The last phrases may still be in recognition
+    for worker in assistant.speech_thread.workers.workers:
+        worker.join()
+    assistant.wait_idle()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    response = tracing.TRACER.stats().get("response", {})
+    return {
+        "turns": len(names),
+        "throughput": len(names) / elapsed,
+        "p50": response.get("p50", 0.0),
+        "p95": response.get("p95", 0.0),
+        "p99": response.get("p99", 0.0),
+        "memory_growth_kb": (tracemalloc.get_traced_memory()[0] - memory_start) / 1024,
+    }
+
+
+def compare(result, baseline, tolerance):
+    # Returns a description of every figure that got worse than allowed
+    problems = []
+    for key in ("p50", "p95", "p99"):
+        if result[key] > baseline[key] * (1 + tolerance):
+            problems.append(f"{key} {result[key] * 1000:.1f} ms > baseline {baseline[key] * 1000:.1f} ms")
+    if result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        problems.append(f"throughput {result['throughput']:.2f}/s < baseline {baseline['throughput']:.2f}/s")
+    # Small allocations come and go; only growth beyond 256 KB on top of the baseline counts
+    allowed = baseline["memory_growth_kb"] * (1 + tolerance) + 256
+    if result["memory_growth_kb"] > allowed:
+        problems.append(f"memory growth {result['memory_growth_kb']:.0f} KB > allowed {allowed:.0f} KB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless end-to-end pipeline benchmark")
+    parser.add_argument("scripts", nargs="+", help="assistants to benchmark, e.g. j1.py j3.py")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10, help="turns run before measuring")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mix", help="query mix file with 'weight language utterance' lines")
+    parser.add_argument("--audio", help="directory of .wav fixtures, each with a .txt transcript")
+    parser.add_argument("--wiki-latency", type=float, default=0.05)
+    parser.add_argument("--translate-latency", type=float, default=0.03)
+    parser.add_argument("--recognition-latency", type=float, default=0.2)
+    parser.add_argument("--speech-latency", type=float, default=0.01, help="seconds per spoken item")
+    parser.add_argument("--per-character", type=float, default=0.0005, help="extra seconds per spoken character")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression as a fraction")
+    args = parser.parse_args()
+
+    mix = load_mix(args.mix) if args.mix else MIX
+    BACKENDS["fixture"] = FixtureBackend
+    server = StandInServer(args.wiki_latency, args.translate_latency)
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+
+    tracemalloc.start()
+    failed = False
+    for script in args.scripts:
+        config = runpy.run_path(script)["CONFIG"]
+        directory = tempfile.mkdtemp(prefix="jarvis-bench-")
+        tracing.TRACER.reset()
+        assistant = BenchAssistant(config, server, directory, args.speech_latency, args.per_character)
+        try:
+            assistant.wait_idle()
+            result = run_audio(assistant, args) if args.audio else run_transcripts(assistant, config, args, mix)
+        finally:
+            assistant.shutdown()
+            shutil.rmtree(directory, ignore_errors=True)
+
+        name = os.path.basename(script) + (" audio" if args.audio else "")
+        print(f"{name}: {result['turns']} turns, {result['throughput']:.2f} turns/s, "
+              f"p50 {result['p50'] * 1000:.0f} ms, p95 {result['p95'] * 1000:.0f} ms, p99 {result['p99'] * 1000:.0f} ms, "
+              f"memory growth {result['memory_growth_kb']:.0f} KB")
+        print(tracing.TRACER.format_stats())
+
+        if args.update_baseline:
+            baselines[name] = result
+        elif name in baselines and baselines[name]["turns"] != result["turns"]:
+            print(f"Baseline for {name} was taken over {baselines[name]['turns']} turns; not compared")
+        elif name in baselines:
+            problems = compare(result, baselines[name], args.tolerance)
+            for problem in problems:
+                print(f"REGRESSION {name}: {problem}")
+            failed = failed or bool(problems)
+        else:
+            print(f"No baseline for {name} in {args.baseline}; run with --update-baseline to add one")
+        print()
+
+    server.shutdown()
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
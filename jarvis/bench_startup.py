@@ -0,0 +1,62 @@
+# Measures how long an assistant takes to show its window and to start
+# listening, from process launch. Each run starts a fresh interpreter.
+#
+#   python -m jarvis.bench_startup j3.py --runs 5
+#
+# Set JARVIS_AUDIO_DIR to benchmark without a microphone.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+MILESTONES = ("window", "listening")
+
+
+def measure(script, timeout):
+    env = dict(os.environ, JARVIS_STARTUP_BENCH="1")
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, script], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               text=True, env=env)
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    times = {}
+    try:
+        for line in process.stdout:
+            if line.startswith("JARVIS_STARTUP "):
+                times.setdefault(line.split()[1], time.perf_counter() - started)
+                if all(milestone in times for milestone in MILESTONES):
+                    break
+    finally:
+        timer.cancel()
+        process.kill()
+        process.wait()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-window and time-to-first-listen benchmark")
+    parser.add_argument("script", help="entry point to launch, e.g. j3.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for each run")
+    args = parser.parse_args()
+
+    results = {milestone: [] for milestone in MILESTONES}
+    for run in range(args.runs):
+        times = measure(args.script, args.timeout)
+        print(f"run {run + 1}: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in times.items()))
+        for milestone, seconds in times.items():
+            results.setdefault(milestone, []).append(seconds)
+
+    for milestone, samples in results.items():
+        if not samples:
+            print(f"time-to-{milestone}: never reached")
+            continue
+        print(f"time-to-{milestone}: median {statistics.median(samples) * 1000:.0f} ms, "
+              f"min {min(samples) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms ({len(samples)} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .transport import TransportError
+from .wiki import DisambiguationError, PageError, WikiClient
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".jarvis")
+
+
+class PersistentCache:
+    # Two-level key/value cache: an in-memory LRU in front of a SQLite table.
+    # Values must be JSON serialisable; every entry carries its own expiry time.
+    # Expired rows stay on disk for another stale_ttl seconds so get_stale()
+    # can still serve them while an upstream service is down.
+    def __init__(self, path, table, memory_size=256, disk_size=10000, stale_ttl=30 * 24 * 3600):
+        self.table = table
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.stale_ttl = stale_ttl
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.writes = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+        self.conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self.memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.memory[key]
+
+            row = self.conn.execute(
+                f"SELECT value, expires FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                if row[1] > now:
+                    value = json.loads(row[0])
+                    self.conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+                    self.conn.commit()
+                    self._remember(key, row[1], value)
+                    self.hits += 1
+                    return value
+                if row[1] + self.stale_ttl <= now:
+                    self.conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self.conn.commit()
+
+            self.misses += 1
+            return None
+
+    def peek(self, key):
+        # Like get(), but leaves the statistics and recency order alone
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            row = self.conn.execute(f"SELECT value, expires FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] > now:
+                return json.loads(row[0])
+            return None
+
+    def get_stale(self, key):
+        # Returns the entry even if it has expired, as long as it is still on disk
+        with self.lock:
+            row = self.conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.stale_hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, value, ttl):
+        now = time.time()
+        expires = now + ttl
+        with self.lock:
+            self._remember(key, expires, value)
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires, now),
+            )
+            self.writes += 1
+            # Trimming the table is comparatively expensive, so only do it every so often
+            if self.writes % 100 == 0:
+                self._evict(now)
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.conn.execute(f"DELETE FROM {self.table}")
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stale_hits": self.stale_hits,
+                "memory_entries": len(self.memory),
+            }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _remember(self, key, expires, value):
+        self.memory[key] = (expires, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _evict(self, now):
+        self.conn.execute(f"DELETE FROM {self.table} WHERE expires <= ?", (now - self.stale_ttl,))
+        self.conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.disk_size,),
+        )
+
+
+class SummaryCache:
+    # Caches wiki summaries, including "not found" and disambiguation
+    # outcomes, which are kept for a shorter time.
+    def __init__(self, path=None, ttl=7 * 24 * 3600, negative_ttl=3600, memory_size=256, disk_size=10000, client=None):
+        if path is None:
+            path = os.path.join(CACHE_DIR, "summaries.db")
+        self.store = PersistentCache(path, "summaries", memory_size, disk_size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.client = client or WikiClient()
+        self.pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="wiki")
+
+    def summary(self, query, sentences=2, language="en", cancelled=None):
+        key = json.dumps([language, normalize_query(query), sentences])
+        entry = self.store.get(key)
+        if entry is None:
+            try:
+                entry = self._fetch(query, sentences, language, cancelled)
+            except TransportError:
+                # The wiki is unreachable; an out of date answer beats none
+                entry = self.store.get_stale(key)
+                if entry is None:
+                    raise
+            else:
+                self.store.put(key, entry, self.ttl if "summary" in entry else self.negative_ttl)
+
+        # Replay cached failures as the exceptions the client raises
+        if "summary" in entry:
+            return entry["summary"]
+        if "options" in entry:
+            raise DisambiguationError(query, entry["options"])
+        raise PageError(query)
+
+    def known(self, query, sentences=2, language="en"):
+        # Whether a summary for the query is cached, without looking it up
+        entry = self.store.peek(json.dumps([language, normalize_query(query), sentences]))
+        return entry is not None and "summary" in entry
+
+    def lookup(self, query, language, sentences=2, fallback="en", grace=0.3, cancelled=None):
+        # Asks the wiki in the given language and the fallback wiki at the
+        # same time. An answer in the given language is preferred: if the
+        # fallback answers first, the other one still gets `grace` seconds.
+        # Setting cancelled abandons both. Returns the summary and the
+        # language it is in.
+        if language == fallback:
+            return self.summary(query, sentences, language, cancelled), language
+
+        native_cancelled, backup_cancelled = threading.Event(), threading.Event()
+        native = self.pool.submit(self.summary, query, sentences, language, AnyEvent(native_cancelled, cancelled))
+        backup = self.pool.submit(self.summary, query, sentences, fallback, AnyEvent(backup_cancelled, cancelled))
+
+        wait([native, backup], return_when=FIRST_COMPLETED)
+        if not native.done() and backup.exception() is None:
+            wait([native], timeout=grace)
+        if not native.done() and backup.exception() is None:
+            native_cancelled.set()
+            native.cancel()
+            return backup.result(), fallback
+
+        try:
+            result = native.result()
+        except DisambiguationError:
+            backup_cancelled.set()
+            backup.cancel()
+            raise
+        except Exception:
+            # Not there (or unreachable); whatever the fallback wiki says goes
+            return backup.result(), fallback
+        backup_cancelled.set()
+        backup.cancel()
+        return result, language
+
+    def stats(self):
+        return self.store.stats()
+
+    def _fetch(self, query, sentences, language, cancelled):
+        try:
+            return {"summary": self.client.summary(query, sentences, language, cancelled)}
+        except DisambiguationError as e:
+            return {"options": e.options}
+        except PageError:
+            return {"missing": True}
+
+
+class AnyEvent:
+    # Looks set as soon as any of the events (None is skipped) is
+    def __init__(self, *events):
+        self.events = [event for event in events if event is not None]
+
+    def is_set(self):
+        return any(event.is_set() for event in self.events)
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
@@ -0,0 +1,187 @@
+import itertools
+import queue
+import threading
+
+from .lazy import lazy_import
+from .noise import NoiseFloor
+
+sr = lazy_import("speech_recognition")
+
+
+class RingBuffer:
+    # Preallocated byte ring that the capture loop writes microphone frames
+    # into. Positions are absolute byte counts since the start of capture.
+    def __init__(self, size):
+        self.data = bytearray(size)
+        self.size = size
+        self.end = 0
+
+    def write(self, frame):
+        offset = self.end % self.size
+        first = min(len(frame), self.size - offset)
+        self.data[offset:offset + first] = frame[:first]
+        self.data[:len(frame) - first] = frame[first:]
+        self.end += len(frame)
+        return self.end
+
+    def read(self, start, end):
+        if start < self.end - self.size:
+            raise ValueError("Requested audio has already been overwritten")
+        first, last = start % self.size, end % self.size
+        if end - start == 0:
+            return b""
+        if first < last:
+            return bytes(self.data[first:last])
+        return bytes(self.data[first:] + self.data[:last])
+
+
+class PhraseCapture:
+    # Reads frames from an open audio source without ever waiting on the
+    # recognizer, and cuts them into phrases using a running noise floor and
+    # the recognizer's pause settings. Each phrase is handed to on_phrase as AudioData.
+    def __init__(self, recognizer, on_phrase, phrase_time_limit=None, buffer_seconds=30, calibration=0.5, on_ready=None):
+        self.recognizer = recognizer
+        self.on_phrase = on_phrase
+        self.on_ready = on_ready
+        self.phrase_time_limit = phrase_time_limit
+        self.buffer_seconds = buffer_seconds
+        self.calibration = calibration
+        self.noise = None
+        self.phrase_snr = None
+        self.is_running = True
+
+    def run(self, source):
+        recognizer = self.recognizer
+        # No up-front calibration: the noise floor settles over the first
+        # `calibration` seconds while frames are already being captured
+        self.noise = NoiseFloor(source.SAMPLE_RATE, source.SAMPLE_WIDTH, settle=self.calibration)
+        if self.on_ready is not None:
+            self.on_ready()
+
+        width = source.SAMPLE_WIDTH
+        bytes_per_second = source.SAMPLE_RATE * width
+        seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+        ring = RingBuffer(int(self.buffer_seconds * bytes_per_second))
+
+        pre_roll = int(recognizer.non_speaking_duration * bytes_per_second)
+        max_phrase = ring.size - pre_roll
+        if self.phrase_time_limit:
+            max_phrase = min(max_phrase, int(self.phrase_time_limit * bytes_per_second))
+
+        phrase_start = None
+        speaking_time = pause_time = peak = 0
+        while self.is_running:
+            frame = source.stream.read(source.CHUNK)
+            if not frame:
+                # The source has run dry; don't lose a phrase that was still going
+                if phrase_start is not None and speaking_time >= recognizer.phrase_threshold:
+                    self.phrase_snr = self.noise.snr(peak)
+                    self.on_phrase(sr.AudioData(ring.read(phrase_start, ring.end), source.SAMPLE_RATE, width))
+                break
+            end = ring.write(frame)
+            energy = self.noise.update(frame)
+            if recognizer.dynamic_energy_threshold:
+                recognizer.energy_threshold = self.noise.threshold
+
+            if phrase_start is None:
+                if energy > recognizer.energy_threshold:
+                    phrase_start = max(0, end - len(frame) - pre_roll, end - ring.size)
+                    speaking_time, pause_time, peak = seconds_per_buffer, 0, energy
+                continue
+
+            if energy > recognizer.energy_threshold:
+                speaking_time += seconds_per_buffer
+                pause_time = 0
+                peak = max(peak, energy)
+            else:
+                pause_time += seconds_per_buffer
+
+            if pause_time > recognizer.pause_threshold or end - phrase_start >= max_phrase:
+                if speaking_time >= recognizer.phrase_threshold:
+                    self.phrase_snr = self.noise.snr(peak)
+                    audio = sr.AudioData(ring.read(phrase_start, end), source.SAMPLE_RATE, width)
+                    self.on_phrase(audio)
+                phrase_start = None
+
+    def metrics(self):
+        # Current noise floor, speech threshold and SNR, plus the peak SNR of the last phrase
+        if self.noise is None:
+            return {}
+        metrics = self.noise.metrics()
+        metrics["threshold"] = round(self.recognizer.energy_threshold, 1)
+        if self.phrase_snr is not None:
+            metrics["phrase_snr_db"] = round(self.phrase_snr, 1)
+        return metrics
+
+    def stop(self):
+        self.is_running = False
+
+
+class RecognitionPool:
+    # Worker threads that recognize captured phrases in parallel. Results are
+    # handed to deliver() in the order the phrases were captured.
+    def __init__(self, recognize, deliver, workers=2, max_pending=8):
+        self.recognize = recognize
+        self.deliver = deliver
+        self.phrases = queue.Queue()
+        self.max_pending = max_pending
+        self.workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        self.sequence = itertools.count()
+        self.next_to_deliver = 0
+        self.finished = {}
+        self.lock = threading.Lock()
+        self.deliver_lock = threading.Lock()
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, audio):
+        with self.lock:
+            if self.phrases.qsize() >= self.max_pending:
+                print("Recognizer is falling behind, dropping phrase")
+                return
+            self.phrases.put((next(self.sequence), audio))
+
+    def stop(self):
+        for _ in self.workers:
+            self.phrases.put(None)
+
+    def _work(self):
+        while True:
+            item = self.phrases.get()
+            if item is None:
+                return
+            number, audio = item
+            try:
+                result = self.recognize(audio)
+            except Exception as e:
+                print(f"Recognition failed; {e}")
+                result = None
+
+            with self.lock:
+                self.finished[number] = result
+            # Whichever worker holds deliver_lock hands out every result that is
+            # next in line; the others go straight back to recognizing
+            while self.deliver_lock.acquire(blocking=False):
+                try:
+                    self._deliver_ready()
+                finally:
+                    self.deliver_lock.release()
+                with self.lock:
+                    if self.next_to_deliver not in self.finished:
+                        break
+
+    def _deliver_ready(self):
+        while True:
+            with self.lock:
+                if self.next_to_deliver not in self.finished:
+                    return
+                result = self.finished.pop(self.next_to_deliver)
+                self.next_to_deliver += 1
+            if result is None:
+                continue
+            try:
+                self.deliver(result)
+            except Exception as e:
+                print(f"Error handling recognized speech; {e}")
@@ -0,0 +1,55 @@
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from .gate import KEYWORDS
+
+UNKNOWN_COMMAND = "I'm sorry, I can only perform searches at the moment. Please say 'search' followed by your query."
+
+
+@dataclass
+class AssistantConfig:
+    # Everything that differs between the j1-j5 assistants
+    title: str = "Voice Assistant"
+    geometry: str = "400x300"
+    text_width: int = 40
+    text_height: int = 10
+    transcript_lines: int = 500
+    start_button: bool = False  # wait for "Start Listening" instead of listening straight away
+    stop_button: bool = True  # show "Stop Processing"
+    voice_stop_command: bool = False  # saying "stop" cancels running commands
+    detect_language: bool = False  # reply in the language that was spoken
+    translate: bool = False  # translate replies into that language
+    native_wiki: bool = False  # search the wiki of that language before the English one
+    cache_speech: bool = True  # render each phrase to audio once and replay it from the cache
+    prerender_languages: List[str] = field(default_factory=list)  # render the translated prompts for these at startup
+    knowledge_index: Optional[str] = None  # offline article index to answer from first (also JARVIS_KNOWLEDGE)
+    title_index: Optional[str] = None  # article titles to correct misheard search queries against (also JARVIS_TITLES)
+    recognizer_language: str = "en-US"
+    alternatives: int = 3  # recognition alternatives whose searches are looked up at once; 1 uses only the best guess
+    phrase_time_limit: Optional[float] = 5
+    compress_audio: bool = True  # trim, resample to 16 kHz and FLAC encode phrases before recognition
+    processes: Optional[int] = 0  # worker processes for audio, local recognition and langdetect; 0: threads, None: one per core
+    keyword_gate: bool = False  # only recognize phrases in which PocketSphinx spots one of `keywords`
+    echo_suppression: bool = True  # drop phrases heard while the assistant speaks, unless they have a keyword (English only)
+    keywords: List[str] = field(default_factory=lambda: list(KEYWORDS))
+    calibration: float = 0.5  # seconds the noise floor takes to settle after the microphone opens
+    command_timeout: float = 30
+    unknown_command: str = UNKNOWN_COMMAND
+    stats_pane: bool = False  # show per-stage latency percentiles under the transcript
+    plugins: List[Callable] = field(default_factory=list)  # each is called with the AssistantGUI at startup
+
+    def dependencies(self):
+        # Modules worth loading in the background as soon as the window is up
+        modules = ["speech_recognition", "pyttsx3", "numpy"]
+        if self.cache_speech:
+            modules.append("pyaudio")
+        if self.detect_language:
+            modules.append("langdetect")
+        if self.keyword_gate or self.suppresses_echo():
+            modules.append("pocketsphinx")
+        return modules
+
+    def suppresses_echo(self):
+        # The keyword spotter only knows English words, so in any other
+        # language a barge-in would be taken for echo and dropped
+        return self.echo_suppression and not self.detect_language and self.recognizer_language.startswith("en")
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import tracing
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CommandHandle:
+    # Passed to every command as its first argument. Commands call check()
+    # between steps so that a cancelled or timed out command stops as soon
+    # as its current step returns; its results are discarded either way.
+    def __init__(self, name):
+        self.name = name
+        self.event = threading.Event()
+        self.future = None
+        self.timer = None
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        if self.event.is_set():
+            raise Cancelled(self.reason)
+
+    def cancel(self, reason="cancelled"):
+        if not self.event.is_set():
+            self.reason = reason
+            self.event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class CommandExecutor:
+    # Runs commands on a thread pool so they never hold up speech capture.
+    # on_result/on_error are called through the dispatcher (normally a
+    # TkDispatcher), so they run on the Tk thread.
+    def __init__(self, dispatcher=None, max_workers=4):
+        self.dispatcher = dispatcher
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="command")
+        self.active = set()
+        self.lock = threading.Lock()
+
+    def submit(self, name, fn, *args, timeout=None, on_result=None, on_error=None):
+        handle = CommandHandle(name)
+        with self.lock:
+            self.active.add(handle)
+        if timeout:
+            handle.timer = threading.Timer(timeout, self._timed_out, (handle, on_error))
+            handle.timer.daemon = True
+            handle.timer.start()
+        handle.future = self.pool.submit(self._run, handle, fn, args, tracing.current_turn(), time.monotonic())
+        handle.future.add_done_callback(lambda future: self._finished(handle, future, on_result, on_error))
+        return handle
+
+    def cancel_all(self):
+        with self.lock:
+            handles = list(self.active)
+        for handle in handles:
+            handle.cancel()
+
+    def busy(self):
+        with self.lock:
+            return bool(self.active)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, handle, fn, args, turn, submitted):
+        # The command belongs to the turn that submitted it
+        with tracing.bind(turn):
+            tracing.record("command_wait", time.monotonic() - submitted)
+            handle.check()
+            return fn(handle, *args)
+
+    def _timed_out(self, handle, on_error):
+        if self._retire(handle):
+            handle.cancel("timed out")
+            self._notify(on_error, TimeoutError(f"{handle.name} timed out"))
+
+    def _finished(self, handle, future, on_result, on_error):
+        if handle.timer is not None:
+            handle.timer.cancel()
+        if not self._retire(handle):
+            return  # already reported as timed out
+        if handle.cancelled or future.cancelled():
+            self._notify(on_error, Cancelled(handle.reason))
+        elif future.exception() is not None:
+            error = future.exception()
+            self._notify(on_error, Cancelled(handle.reason) if isinstance(error, Cancelled) else error)
+        else:
+            self._notify(on_result, future.result())
+
+    def _retire(self, handle):
+        with self.lock:
+            if handle not in self.active:
+                return False
+            self.active.remove(handle)
+            return True
+
+    def _notify(self, callback, value):
+        if callback is None:
+            return
+        if self.dispatcher is not None:
+            self.dispatcher.call(callback, value)
+        else:
+            callback(value)
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from . import tracing
+from .lazy import lazy_import
+from .recognizers import decode, sphinx_decoder
+
+sr = lazy_import("speech_recognition")
+
+# Words that let a phrase through the gate: the wake word and the first
+# words of the built-in English commands. They must be in PocketSphinx's
+# en-US dictionary.
+KEYWORDS = ["jarvis", "search", "find", "look", "exit", "quit", "goodbye", "stop", "cancel"]
+
+
+class SpeakingTracker:
+    # Remembers when the assistant's own voice was coming out of the
+    # speakers, so phrases the microphone picked up meanwhile can be told apart
+    def __init__(self, history=32):
+        self.intervals = deque(maxlen=history)
+        self.started = None
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def audible(self):
+        with self.lock:
+            self.started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.intervals.append((self.started, time.monotonic()))
+                self.started = None
+
+    def overlap(self, start, end):
+        # Seconds of [start, end] during which the assistant was speaking
+        with self.lock:
+            intervals = list(self.intervals)
+            if self.started is not None:
+                intervals.append((self.started, time.monotonic()))
+        return sum(max(0.0, min(end, stop) - max(start, begin)) for begin, stop in intervals)
+
+
+class KeywordSpotter:
+    # PocketSphinx in keyword search mode: runs locally on a captured phrase
+    # and returns the first keyword heard in it, or None. The decoder is
+    # built on the first phrase and kept for the rest. Raises
+    # sr.RequestError when PocketSphinx isn't installed.
+    def __init__(self, keywords=KEYWORDS, sensitivity=0.7, language="en-US"):
+        self.keywords = list(keywords)
+        self.sensitivity = sensitivity
+        self.language = language
+        self.decoder = None
+        self.lock = threading.Lock()
+
+    def spot(self, audio):
+        with self.lock:
+            if self.decoder is None:
+                self.decoder = self._decoder()
+            heard = decode(self.decoder, audio)
+        words = heard.split() if heard else []
+        return words[0] if words else None
+
+    def _decoder(self):
+        # PocketSphinx reads the keyword list from a file, once
+        threshold = 100 * self.sensitivity - 110
+        with tempfile.NamedTemporaryFile("w", suffix=".kws", delete=False) as f:
+            f.writelines(f"{keyword} /1e{threshold:g}/\n" for keyword in self.keywords)
+        try:
+            return sphinx_decoder(self.language, kws=f.name)
+        finally:
+            os.unlink(f.name)
+
+
+class SpeechGate:
+    # Decides which captured phrases go on to the recognizer. Phrases that
+    # the assistant's own speech covers for at least echo_fraction of their
+    # length are its echo and are dropped unless a keyword is heard in them
+    # ("stop" still barges in). With require_keyword every phrase needs a
+    # keyword. spot(audio) returns the keyword heard or None; without it (or
+    # PocketSphinx) keywords can't be checked, so echoes are dropped and
+    # everything else goes through.
+    def __init__(self, spot=None, speaking=None, require_keyword=False, echo_fraction=0.5):
+        self.spot = spot
+        self.speaking = speaking
+        self.require_keyword = require_keyword
+        self.echo_fraction = echo_fraction
+        self.lock = threading.Lock()
+        self.forwarded = 0
+        self.dropped_echo = 0
+        self.dropped_keyword = 0
+
+    def admit(self, audio, start, end):
+        # start and end are time.monotonic() values for when the phrase was captured
+        echo = (self.speaking is not None and end > start
+                and self.speaking.overlap(start, end) / (end - start) >= self.echo_fraction)
+        if not echo and not self.require_keyword:
+            return self._count("forwarded")
+        with self.lock:
+            spot = self.spot
+        if spot is None:
+            return self._count("dropped_echo" if echo else "forwarded")
+        try:
+            with tracing.span("gate"):
+                keyword = spot(audio)
+        except sr.RequestError as e:
+            # Phrases are checked on several threads at once; only the first to fail says so
+            with self.lock:
+                first = self.spot is spot
+                self.spot = None
+            if first:
+                print(f"Keyword spotting unavailable, phrases are no longer checked for keywords; {e}")
+            return self.admit(audio, start, end)
+        if keyword is not None:
+            return self._count("forwarded")
+        return self._count("dropped_echo" if echo else "dropped_keyword")
+
+    def metrics(self):
+        with self.lock:
+            return {"forwarded": self.forwarded, "dropped_echo": self.dropped_echo,
+                    "dropped_keyword": self.dropped_keyword}
+
+    def _count(self, outcome):
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+        return outcome == "forwarded"
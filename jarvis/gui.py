@@ -0,0 +1,93 @@
+import time
+import tkinter as tk
+from tkinter import scrolledtext
+
+from . import tracing
+from .assistant import Assistant
+from .startup import mark
+from .tk_dispatch import TkDispatcher
+from .transcript import Transcript
+
+
+class AssistantGUI(Assistant):
+    def __init__(self, master, config):
+        self.master = master
+        master.title(config.title)
+        master.geometry(config.geometry)
+
+        self.text_area = scrolledtext.ScrolledText(master, wrap=tk.WORD, width=config.text_width, height=config.text_height)
+        self.text_area.pack(padx=10, pady=10)
+
+        self.start_button = None
+        if config.start_button:
+            self.start_button = tk.Button(master, text="Start Listening", command=self.toggle_listening)
+            self.start_button.pack(pady=5)
+
+        self.stop_button = None
+        if config.stop_button:
+            self.stop_button = tk.Button(master, text="Stop Processing", command=self.stop_processing, state=tk.DISABLED)
+            self.stop_button.pack(pady=5)
+
+        self.stats_label = None
+        if config.stats_pane:
+            self.stats_label = tk.Label(master, font=("Courier", 8), justify=tk.LEFT, anchor=tk.W)
+            self.stats_label.pack(padx=10, fill=tk.X)
+
+        dispatcher = TkDispatcher(master)
+        if self.stats_label is not None:
+            self.stats_updated = 0
+            dispatcher.add_tick_handler(self.update_stats)
+        self.transcript = Transcript(self.text_area, dispatcher, config.transcript_lines)
+        Assistant.__init__(self, config, dispatcher)
+
+        master.after(0, mark, "window")
+        if not config.start_button:
+            self.start_listening()
+
+    def toggle_listening(self):
+        if self.speech_thread is None:
+            self.start_listening()
+        else:
+            self.stop_listening()
+
+    def start_listening(self):
+        Assistant.start_listening(self)
+        if self.start_button is not None:
+            self.start_button.config(text="Stop Listening")
+
+    def stop_listening(self):
+        Assistant.stop_listening(self)
+        self.start_button.config(text="Start Listening")
+
+    def update_stats(self):
+        # Runs on every dispatcher tick; the pane only needs refreshing once a second
+        now = time.monotonic()
+        if now - self.stats_updated < 1:
+            return
+        self.stats_updated = now
+        text = tracing.TRACER.format_stats()
+        if self.speech_thread is not None:
+            metrics = self.speech_thread.metrics()
+            if metrics:
+                text += "\n" + "  ".join(f"{name} {value}" for name, value in metrics.items())
+        self.stats_label.config(text=text)
+
+    def add_to_text_area(self, text):
+        # Safe to call from any thread
+        self.transcript.append(text)
+
+    def show(self, text):
+        self.add_to_text_area(text)
+
+    def busy_changed(self, busy):
+        if self.stop_button is not None:
+            self.stop_button.config(state=tk.NORMAL if busy else tk.DISABLED)
+
+    def quit(self):
+        self.master.quit()
+
+
+def run(config):
+    root = tk.Tk()
+    AssistantGUI(root, config)
+    root.mainloop()
@@ -0,0 +1,147 @@
+import re
+import threading
+
+# Built-in command phrases, with synonyms in the languages the assistant is
+# used in. {name} marks a slot that captures the rest of the words there.
+SEARCH_PHRASES = [
+    "search {query}", "search for {query}", "look up {query}", "find {query}",
+    "buscar {query}", "busca {query}", "chercher {query}", "cherche {query}", "recherche {query}",
+    "suche {query}", "suche nach {query}", "cerca {query}", "pesquisar {query}", "procurar {query}",
+    "zoek {query}", "zoek naar {query}",
+]
+EXIT_PHRASES = ["exit", "quit", "goodbye", "salir", "quitter", "beenden", "esci", "sair", "afsluiten"]
+STOP_PHRASES = ["stop", "cancel", "stop that", "detener", "para", "parar", "arrête", "stopp", "fermati"]
+
+# Politeness and wake words that may come before any command
+LEADING_WORDS = ["please", "can you", "could you", "would you", "hey jarvis", "ok jarvis", "jarvis"]
+# Politeness and wake words that may come after a command
+TRAILING_WORDS = ["please", "thanks", "thank you", "jarvis"]
+FILLER = re.compile(r"^(?:(?:%s)\s+)+" % "|".join(LEADING_WORDS))
+TRAILING_FILLER = re.compile(r"(?:\s+(?:%s))+$" % "|".join(TRAILING_WORDS))
+PUNCTUATION = re.compile(r"[^\w\s']+")
+SLOT = re.compile(r"\{(\w+)\}")
+
+# Utterances are matched as they were heard, ignoring case, so slot values
+# keep their punctuation ("c++", "AT&T"); only the punctuation a transcript
+# puts between words and sentences is skipped, and the same filler as above
+GAP = r"[^\w']+"
+SLOT_GAP = r"[.,!?;:]*\s+"
+PAUSE = r"[.,!?;:]*"
+FIRST_WORD = re.compile(r"[^\w']*([\w']*)")
+HEARD_FILLER = re.compile(r"^[^\w']*(?:(?:%s)%s)*" % ("|".join(word.replace(" ", GAP) for word in LEADING_WORDS), GAP),
+                          re.IGNORECASE)
+HEARD_TRAILING_FILLER = re.compile(r"(?:%s(?:%s))+%s$" % (SLOT_GAP, "|".join(word.replace(" ", GAP) for word in TRAILING_WORDS),
+                                                          PAUSE), re.IGNORECASE)
+
+
+class Intent:
+    def __init__(self, name, phrases, handler, priority=0):
+        self.name = name
+        self.phrases = list(phrases)
+        self.handler = handler
+        self.priority = priority
+
+
+class IntentMatch:
+    def __init__(self, intent, slots):
+        self.intent = intent
+        self.slots = slots
+
+
+class IntentRegistry:
+    # Matches a whole utterance against every registered phrase. Phrases are
+    # bucketed by their first word and each bucket is compiled into a single
+    # regular expression, so dispatch cost barely grows with the number of
+    # intents. A phrase has to cover the whole utterance, so "research stop
+    # words" is not a search and "exit" only quits when said on its own.
+    def __init__(self):
+        self.intents = []
+        self.buckets = None
+        self.lock = threading.Lock()
+
+    def register(self, name, phrases, handler, priority=0):
+        # Filler in a phrase is left out; it is optional around any utterance
+        intent = Intent(name, [normalize(phrase) for phrase in phrases], handler, priority)
+        with self.lock:
+            self.intents = [existing for existing in self.intents if existing.name != name] + [intent]
+            self.buckets = None
+        return intent
+
+    def unregister(self, name):
+        with self.lock:
+            self.intents = [intent for intent in self.intents if intent.name != name]
+            self.buckets = None
+
+    def match(self, text):
+        buckets = self.buckets or self._compile()
+        text = HEARD_FILLER.sub("", text.strip())
+        first_word = FIRST_WORD.match(text).group(1).lower()
+        # Trailing filler is only kept when nothing matches without it, as
+        # the query of "search thank you"
+        texts = [HEARD_TRAILING_FILLER.sub("", text), text]
+        for key in (first_word, None):
+            bucket = buckets.get(key)
+            if bucket is None:
+                continue
+            pattern, alternatives = bucket
+            for heard in texts[texts[0] == text:]:
+                found = pattern.fullmatch(heard)
+                if found:
+                    intent, slots = alternatives[found.lastgroup]
+                    return IntentMatch(intent, {slot: found.group(group) for slot, group in slots.items()})
+        return None
+
+    def _compile(self):
+        with self.lock:
+            if self.buckets is not None:
+                return self.buckets
+            phrases = {}
+            # Higher priority first, then longer phrases so "search for {query}" beats "search {query}"
+            ordered = sorted(((intent, phrase) for intent in self.intents for phrase in intent.phrases),
+                             key=lambda item: (-item[0].priority, -len(SLOT.sub('', item[1]))))
+            for intent, phrase in ordered:
+                first_word = phrase.split()[0]
+                key = None if SLOT.fullmatch(first_word) else first_word
+                phrases.setdefault(key, []).append((intent, phrase))
+
+            buckets = {}
+            for key, entries in phrases.items():
+                parts, alternatives = [], {}
+                for number, (intent, phrase) in enumerate(entries):
+                    group = f"p{number}"
+                    body, slots = compile_phrase(phrase, group)
+                    parts.append(f"(?P<{group}>{body})")
+                    alternatives[group] = (intent, slots)
+                pattern = "(?:%s)%s" % ("|".join(parts), PAUSE)
+                buckets[key] = (re.compile(pattern, re.IGNORECASE), alternatives)
+            self.buckets = buckets
+            return buckets
+
+
+def compile_phrase(phrase, group):
+    # phrase is normalized; words are matched across punctuation, but next to
+    # a slot only sentence punctuation is skipped so the value keeps the rest
+    slots = {}
+    body = ""
+    last = None
+    for word in phrase.split():
+        slot = SLOT.fullmatch(word)
+        if last is not None:
+            body += GAP if last and not slot else SLOT_GAP
+        if slot:
+            slots[slot.group(1)] = f"{group}_{slot.group(1)}"
+            body += f"(?P<{group}_{slot.group(1)}>.+?)"
+        else:
+            body += re.escape(word)
+        last = not slot
+    if last:
+        body += r"[^\w']*"
+    return body, slots
+
+
+def normalize(phrase):
+    # Lower case words without punctuation or the filler around them; slots
+    # are kept. A phrase that is nothing but filler ("jarvis") stays as it is.
+    text = " ".join(" ".join(word if SLOT.fullmatch(word) else PUNCTUATION.sub(" ", word.lower())
+                             for word in phrase.split()).split())
+    return TRAILING_FILLER.sub("", FILLER.sub("", text)) or text
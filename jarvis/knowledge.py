@@ -0,0 +1,231 @@
+# Local, offline index of article abstracts that answers summary lookups
+# without going to the network. Build it from a Wikipedia abstracts dump
+# (e.g. enwiki-latest-abstract.xml.gz) or from JSON lines with "title",
+# "abstract" and optionally "popularity", "disambiguation" and "options":
+#
+#   python -m jarvis.knowledge ingest enwiki-latest-abstract.xml.gz --language en
+#   python -m jarvis.knowledge ingest articles.jsonl --language es
+#   python -m jarvis.knowledge lookup "albert einstein"
+import argparse
+import gzip
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+
+from .cache import CACHE_DIR, normalize_query
+from .streaming import split_sentences
+from .wiki import DisambiguationError, PageError, WikiClient
+
+INDEX_PATH = os.path.join(CACHE_DIR, "knowledge.db")
+
+DISAMBIGUATION_TITLE = re.compile(r"\s*\(disambiguation\)$", re.IGNORECASE)
+REFERS_TO = re.compile(r"(?:may|can|might) (?:also )?refer to:?\s*$", re.IGNORECASE)
+WORD = re.compile(r"\w+")
+# Articles people put in front of a topic that the title usually leaves out
+STOPWORDS = {"the", "a", "an", "of", "el", "la", "los", "las", "le", "les", "der", "die", "das", "il", "lo"}
+
+
+class KnowledgeIndex:
+    # SQLite table of articles with an FTS5 index over their titles and
+    # abstracts. A query is answered by the article whose title is exactly
+    # the query, or else by the best article whose title contains every word
+    # of the query (leaving out words like "the"); the more popular article
+    # wins between similar matches.
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.create_function("log1p", 1, math.log1p, deterministic=True)
+        self.lock = threading.Lock()
+        # Lookups read straight from the memory-mapped file
+        self.conn.execute("PRAGMA mmap_size = 268435456")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY, language TEXT NOT NULL, title TEXT NOT NULL, key TEXT NOT NULL,
+                abstract TEXT NOT NULL, popularity REAL NOT NULL DEFAULT 0,
+                disambiguation INTEGER NOT NULL DEFAULT 0, options TEXT);
+            CREATE INDEX IF NOT EXISTS articles_key ON articles (language, key);
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_text USING fts5(
+                title, abstract, content='articles', content_rowid='id');
+        """)
+
+    def summary(self, query, sentences=2, language='en'):
+        article = self.find(query, language)
+        if article is None:
+            raise PageError(query)
+        title, abstract, disambiguation, options = article
+        if disambiguation:
+            raise DisambiguationError(title, json.loads(options) if options else self.variants(title, language))
+        return " ".join(split_sentences(abstract)[:sentences])
+
+    def find(self, query, language='en'):
+        key = normalize_query(query)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT title, abstract, disambiguation, options FROM articles WHERE language = ? AND key = ? "
+                "ORDER BY lower(title) = key DESC, popularity DESC LIMIT 1", (language, key)).fetchone()
+            if row is not None:
+                return row
+            words = WORD.findall(key)
+            words = [word for word in words if word not in STOPWORDS] or words
+            if not words:
+                return None
+            # Every word has to be in the title; bm25 weighs the title ten times the abstract
+            match = "title : (" + " AND ".join('"' + word.replace('"', '""') + '"' for word in words) + ")"
+            return self.conn.execute(
+                "SELECT a.title, a.abstract, a.disambiguation, a.options FROM articles_text "
+                "JOIN articles a ON a.id = articles_text.rowid "
+                "WHERE articles_text MATCH ? AND a.language = ? "
+                "ORDER BY bm25(articles_text, 10.0, 1.0) - log1p(a.popularity) LIMIT 1",
+                (match, language)).fetchone()
+
+    def variants(self, title, language='en', limit=10):
+        # "Mercury (planet)", "Mercury (element)", ... for a disambiguation page without options
+        base = DISAMBIGUATION_TITLE.sub("", title)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT title FROM articles WHERE language = ? AND key LIKE ? ESCAPE '\\' AND disambiguation = 0 "
+                "ORDER BY popularity DESC LIMIT ?",
+                (language, normalize_query(base).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + " (%", limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, language=None):
+        with self.lock:
+            if language is None:
+                return self.conn.execute("SELECT count(*) FROM articles").fetchone()[0]
+            return self.conn.execute("SELECT count(*) FROM articles WHERE language = ?", (language,)).fetchone()[0]
+
+    def ingest(self, articles, language='en', batch_size=10000):
+        # articles yields (title, abstract, popularity, disambiguation, options) tuples.
+        # Replaces whatever the index held for the language; returns the number of articles added.
+        with self.lock:
+            conn = self.conn
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("DELETE FROM articles WHERE language = ?", (language,))
+            total = 0
+            batch = []
+            for title, abstract, popularity, disambiguation, options in articles:
+                disambiguation = bool(disambiguation or DISAMBIGUATION_TITLE.search(title) or REFERS_TO.search(abstract))
+                key = normalize_query(DISAMBIGUATION_TITLE.sub("", title))
+                batch.append((language, title, key, abstract, popularity or 0, int(disambiguation),
+                               json.dumps(options) if options else None))
+                if len(batch) >= batch_size:
+                    total += self._insert(batch)
+                    batch = []
+            total += self._insert(batch)
+            # The full-text index is rebuilt in one go, which is much faster than row by row
+            conn.execute("INSERT INTO articles_text (articles_text) VALUES ('rebuild')")
+            conn.execute("INSERT INTO articles_text (articles_text) VALUES ('optimize')")
+            conn.commit()
+            conn.execute("PRAGMA synchronous = FULL")
+            return total
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _insert(self, batch):
+        self.conn.executemany(
+            "INSERT INTO articles (language, title, key, abstract, popularity, disambiguation, options) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+        return len(batch)
+
+
+class KnowledgeClient:
+    # Drop-in replacement for WikiClient in SummaryCache: answers from the
+    # local index and only asks the live API when the index has no article
+    # for the query (or no articles at all in that language).
+    def __init__(self, index, live=None):
+        self.index = index
+        self.live = live or WikiClient()
+        self.languages = {}
+        self.local_hits = 0
+        self.live_lookups = 0
+
+    def summary(self, query, sentences=2, language='en', cancelled=None):
+        if self._indexed(language):
+            try:
+                result = self.index.summary(query, sentences, language)
+            except PageError:
+                pass
+            except DisambiguationError:
+                self.local_hits += 1
+                raise
+            else:
+                self.local_hits += 1
+                return result
+        self.live_lookups += 1
+        return self.live.summary(query, sentences, language, cancelled)
+
+    def _indexed(self, language):
+        if language not in self.languages:
+            self.languages[language] = self.index.count(language) > 0
+        return self.languages[language]
+
+
+def read_abstracts_dump(path):
+    # Streams (title, abstract, popularity, disambiguation, options) out of a
+    # Wikipedia abstracts dump. The dump has no page views, so the number of
+    # section links stands in for popularity.
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for _, element in ElementTree.iterparse(f):
+            if element.tag != "doc":
+                continue
+            title = (element.findtext("title") or "").removeprefix("Wikipedia: ").strip()
+            abstract = (element.findtext("abstract") or "").strip()
+            links = len(element.findall("links/sublink"))
+            element.clear()
+            if title and abstract:
+                yield title, abstract, links, False, None
+
+
+def read_jsonl(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            article = json.loads(line)
+            yield (article["title"], article.get("abstract", ""), article.get("popularity", 0),
+                   article.get("disambiguation", False), article.get("options"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the offline knowledge index")
+    parser.add_argument("--index", default=INDEX_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="index an abstracts dump (.xml[.gz]) or JSON lines (.jsonl[.gz])")
+    ingest.add_argument("source")
+    ingest.add_argument("--language", default="en")
+    lookup = commands.add_parser("lookup", help="answer a query from the index")
+    lookup.add_argument("query")
+    lookup.add_argument("--language", default="en")
+    lookup.add_argument("--sentences", type=int, default=2)
+    args = parser.parse_args()
+
+    index = KnowledgeIndex(args.index)
+    started = time.perf_counter()
+    if args.command == "ingest":
+        reader = read_jsonl if ".jsonl" in args.source or ".json" in args.source else read_abstracts_dump
+        count = index.ingest(reader(args.source), args.language)
+        print(f"Indexed {count} articles in {time.perf_counter() - started:.1f} s")
+    else:
+        try:
+            print(index.summary(args.query, args.sentences, args.language))
+        except DisambiguationError as e:
+            print(f"Disambiguation: {', '.join(e.options)}")
+        except PageError as e:
+            print(e)
+        print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
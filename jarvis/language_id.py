@@ -0,0 +1,109 @@
+import re
+import threading
+from collections import OrderedDict
+
+from .lazy import lazy_import
+
+langdetect = lazy_import("langdetect")
+langdetect_errors = lazy_import("langdetect.lang_detect_exception")
+
+# Scripts that are (nearly) unique to one language settle short phrases outright
+SCRIPTS = [
+    (re.compile(r"[぀-ヿ]"), 'ja'),
+    (re.compile(r"[가-힯]"), 'ko'),
+    (re.compile(r"[一-鿿]"), 'zh-cn'),
+    (re.compile(r"[ऀ-ॿ]"), 'hi'),
+    (re.compile(r"[ঀ-৿]"), 'bn'),
+    (re.compile(r"[஀-௿]"), 'ta'),
+    (re.compile(r"[ఀ-౿]"), 'te'),
+    (re.compile(r"[฀-๿]"), 'th'),
+    (re.compile(r"[Ͱ-Ͽ]"), 'el'),
+    (re.compile(r"[֐-׿]"), 'he'),
+    (re.compile(r"[؀-ۿ]"), 'ar'),
+    (re.compile(r"[Ѐ-ӿ]"), 'ru'),
+]
+
+# Command words that identify the language of a short phrase
+COMMAND_WORDS = {
+    'search': 'en', 'exit': 'en', 'stop': 'en', 'find': 'en',
+    'buscar': 'es', 'busca': 'es', 'salir': 'es', 'detener': 'es',
+    'chercher': 'fr', 'cherche': 'fr', 'recherche': 'fr', 'quitter': 'fr', 'arrête': 'fr',
+    'suche': 'de', 'suchen': 'de', 'beenden': 'de', 'stopp': 'de',
+    'cerca': 'it', 'cercare': 'it', 'esci': 'it', 'fermati': 'it',
+    'pesquisar': 'pt', 'procurar': 'pt', 'sair': 'pt', 'parar': 'pt',
+    'zoek': 'nl', 'zoeken': 'nl', 'afsluiten': 'nl',
+}
+
+
+class LanguageIdentifier:
+    # Decides the language of a recognized utterance. Short phrases are
+    # settled from their script, their command words or the session's
+    # current language without running langdetect at all. Longer text goes
+    # through langdetect (memoised per normalised text), and when that is
+    # unsure the session language wins if it is among the candidates.
+    # detect(text) runs langdetect; a worker pool can take it over.
+    def __init__(self, hint=None, short_phrase=3, threshold=0.8, memo_size=1024, detect=None):
+        self.hint = hint.split('-')[0].lower() if hint else None
+        self.detect = detect or detect_languages
+        self.short_phrase = short_phrase
+        self.threshold = threshold
+        self.memo_size = memo_size
+        self.memo = OrderedDict()
+        self.sticky = None
+        self.lock = threading.Lock()
+
+    def identify(self, text):
+        key = " ".join(text.lower().split())
+        prior = self.sticky or self.hint
+        for pattern, language in SCRIPTS:
+            if pattern.search(key):
+                return self._settle(language)
+
+        words = key.split()
+        if len(words) <= self.short_phrase:
+            votes = {COMMAND_WORDS[word] for word in words if word in COMMAND_WORDS}
+            # The English command words are used whatever language people speak,
+            # so they only count while the session has no language yet
+            if len(votes) == 1 and (votes != {'en'} or not self.sticky):
+                return votes.pop()
+            if prior:
+                return prior
+
+        candidates = self._detect(key)
+        if not candidates:
+            return prior or 'en'
+        language, probability = candidates[0]
+        if probability >= self.threshold:
+            if len(words) > self.short_phrase:
+                return self._settle(language)
+            return language
+        if prior and any(candidate == prior for candidate, _ in candidates):
+            return prior
+        return language
+
+    def _settle(self, language):
+        # A confident answer becomes the session language
+        self.sticky = language
+        return language
+
+    def _detect(self, key):
+        with self.lock:
+            if key in self.memo:
+                self.memo.move_to_end(key)
+                return self.memo[key]
+        candidates = self.detect(key)
+        with self.lock:
+            self.memo[key] = candidates
+            while len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        return candidates
+
+
+def detect_languages(text):
+    # langdetect's (language, probability) candidates, most likely first.
+    # langdetect is random unless seeded.
+    langdetect.DetectorFactory.seed = 0
+    try:
+        return [(result.lang, result.prob) for result in langdetect.detect_langs(text)]
+    except langdetect_errors.LangDetectException:
+        return []
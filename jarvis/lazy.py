@@ -0,0 +1,42 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    # Stands in for a module until one of its attributes is used, so heavy
+    # dependencies are only imported when (and on whichever thread) they
+    # are first needed.
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def warm_up(*names):
+    # Imports the given modules on background threads, one per module, so
+    # they load in parallel while the window is already up. Import errors
+    # are left for the code that actually uses the module to report.
+    def load(name):
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+    threads = [threading.Thread(target=load, args=(name,), daemon=True, name=f"warm-up {name}") for name in names]
+    for thread in threads:
+        thread.start()
+    return threads
@@ -0,0 +1,82 @@
+# Picks between the alternative transcripts a recognizer returns for one
+# phrase. The recognizer's first guess is often a near miss ("search albert
+# einstain tower") while a later one is what was said, so the searches among
+# the best few alternatives are scored and looked up together. What kind of
+# command the phrase is comes from the first guess alone: a later "exit" must
+# not quit the app when the recognizer was sure it heard "next".
+from .cache import normalize_query
+
+# What a search query the cache or title index knows is worth
+KNOWN_WEIGHT = 0.5
+# Confidence assumed for alternatives the recognizer gives none for, by rank
+RANK_CONFIDENCE = [0.8, 0.5, 0.4, 0.3]
+# How much surer the recognizer has to be of a later alternative than of its
+# first guess before that alternative decides the command instead
+CONFIDENCE_MARGIN = 0.15
+
+
+class Hypothesis:
+    def __init__(self, text, confidence, rank, match, known):
+        self.text = text
+        self.confidence = confidence
+        self.rank = rank
+        self.match = match
+        self.known = known
+        if confidence is None:
+            confidence = RANK_CONFIDENCE[min(rank, len(RANK_CONFIDENCE) - 1)]
+        self.score = confidence + KNOWN_WEIGHT * known
+
+    @property
+    def query(self):
+        # The search query, if this is a search
+        if self.match is not None and self.match.intent.name == "search":
+            return self.match.slots["query"]
+        return None
+
+    def __repr__(self):
+        return f"Hypothesis({self.text!r}, {self.score:.2f})"
+
+
+def rank_hypotheses(alternatives, intents, known=None):
+    # alternatives are (transcript, confidence) pairs, best first. known(query)
+    # tells whether a search query can be answered without the network.
+    # Returns Hypotheses, most likely first: those for the intent of the
+    # leading guess ordered by score, then the rest in the recognizer's order.
+    hypotheses = []
+    seen = set()
+    for rank, (text, confidence) in enumerate(alternatives):
+        key = normalize_query(text)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        match = intents.match(text)
+        query = match.slots.get("query") if match is not None and match.intent.name == "search" else None
+        hypotheses.append(Hypothesis(text, confidence, rank, match, bool(query and known and known(query))))
+    if not hypotheses:
+        return []
+    top = hypotheses[0]
+    challengers = [hypothesis for hypothesis in hypotheses[1:] if surer(hypothesis, top)]
+    leader = max(challengers, key=lambda hypothesis: hypothesis.confidence, default=top)
+    intent = leader.match.intent.name if leader.match is not None else None
+    alike = [hypothesis for hypothesis in hypotheses if hypothesis is leader
+             or (intent is not None and hypothesis.match is not None and hypothesis.match.intent.name == intent)]
+    alike.sort(key=lambda hypothesis: (-hypothesis.score, hypothesis.rank))
+    return alike + [hypothesis for hypothesis in hypotheses if hypothesis not in alike]
+
+
+def surer(hypothesis, top):
+    # Only confidences the recognizer reported count, never the rank priors
+    return (hypothesis.confidence is not None and top.confidence is not None
+            and hypothesis.confidence >= top.confidence + CONFIDENCE_MARGIN)
+
+
+def search_queries(hypotheses, limit):
+    # The distinct search queries among the hypotheses, best first; none
+    # unless the most likely hypothesis is a search
+    if not hypotheses or hypotheses[0].query is None:
+        return []
+    queries = {}
+    for hypothesis in hypotheses:
+        if hypothesis.query is not None:
+            queries.setdefault(normalize_query(hypothesis.query), hypothesis.query)
+    return list(queries.values())[:limit]
@@ -0,0 +1,73 @@
+import math
+import threading
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+DTYPES = {1: "i1", 2: "<i2", 4: "<i4"}
+
+
+class NoiseFloor:
+    # Tracks the background level of a live microphone frame by frame and
+    # derives the speech threshold from it. Each frame is split into short
+    # windows and the quietest one is taken as the noise estimate, so the floor
+    # keeps following the room even while someone is talking. It drops quickly
+    # when the room gets quieter and rises slowly when it gets louder. For the
+    # first `settle` seconds it moves quickly in both directions.
+    def __init__(self, sample_rate, sample_width, ratio=3.0, min_threshold=30, window=0.01,
+                 rise_time=4.0, fall_time=0.2, settle=0.5):
+        self.dtype = DTYPES[sample_width]
+        self.window = max(1, int(sample_rate * window))
+        self.sample_rate = sample_rate
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.rise_time = rise_time
+        self.fall_time = fall_time
+        self.settle = settle
+        self.elapsed = 0.0
+        self.floor = None
+        self.threshold = min_threshold
+        self.energy = 0.0
+        self.lock = threading.Lock()
+
+    def update(self, frame):
+        # Returns the RMS energy of the frame and moves the floor and threshold
+        samples = np.frombuffer(frame, dtype=self.dtype).astype(np.float64)
+        if not len(samples):
+            return 0.0
+        squares = samples * samples
+        energy = math.sqrt(squares.mean())
+        whole = len(squares) - len(squares) % self.window
+        if whole:
+            quietest = math.sqrt(squares[:whole].reshape(-1, self.window).mean(axis=1).min())
+        else:
+            quietest = energy
+
+        duration = len(samples) / self.sample_rate
+        with self.lock:
+            if self.floor is None:
+                self.floor = quietest
+            else:
+                settling = self.elapsed < self.settle
+                time_constant = self.fall_time if quietest < self.floor or settling else self.rise_time
+                keep = math.exp(-duration / time_constant)
+                self.floor = self.floor * keep + quietest * (1 - keep)
+            self.elapsed += duration
+            self.energy = energy
+            self.threshold = max(self.min_threshold, self.floor * self.ratio)
+        return energy
+
+    def snr(self, energy=None):
+        # Signal-to-noise ratio in dB of the given energy (the last frame's by default)
+        if energy is None:
+            energy = self.energy
+        return 20 * math.log10(max(energy, 1) / max(self.floor or 0, 1))
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "noise_floor": round(self.floor or 0.0, 1),
+                "threshold": round(self.threshold, 1),
+                "snr_db": round(self.snr(), 1),
+            }
@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+
+from .lazy import lazy_import
+from .noise import DTYPES
+
+np = lazy_import("numpy")
+sr = lazy_import("speech_recognition")
+
+# What recognizers are sent: mono 16 kHz 16-bit, which is all speech needs
+TARGET_RATE = 16000
+TARGET_WIDTH = 2
+
+
+class AudioPreprocessor:
+    # Shrinks a captured phrase before it is uploaded: resamples it to 16 kHz
+    # 16-bit and cuts off the silence before and after the speech, keeping
+    # `margin` seconds either side. With encode set the result is FLAC
+    # encoded here, once, and the recognizer is handed those bytes instead of
+    # encoding the phrase itself. Runs on the recognition workers, never on
+    # the capture thread.
+    def __init__(self, encode=True, window=0.02, margin=0.2, ratio=3.0, min_threshold=30):
+        self.encode = encode
+        self.window = max(1, int(TARGET_RATE * window))
+        self.margin = int(TARGET_RATE * margin)
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.lock = threading.Lock()
+        self.phrases = 0
+        self.captured_bytes = 0
+        self.upload_bytes = 0
+        self.encode_seconds = 0.0
+        self.measurement = None
+        self.last = {}
+
+    def process(self, audio, threshold=None):
+        # audio is sr.AudioData; threshold is the speech energy threshold in
+        # the audio's own sample width (the recognizer's energy_threshold).
+        # Returns AudioData at TARGET_RATE.
+        started = time.perf_counter()
+        samples = to_samples(audio.frame_data, audio.sample_width)
+        samples = resample(samples, audio.sample_rate, TARGET_RATE)
+        if threshold is not None:
+            threshold *= 2 ** (8 * (TARGET_WIDTH - audio.sample_width))
+        kept = self.trim(samples, threshold)
+        frames = np.clip(np.rint(kept), -32768, 32767).astype("<i2").tobytes()
+        prepared = sr.AudioData(frames, TARGET_RATE, TARGET_WIDTH)
+        upload = len(frames)
+        if self.encode:
+            flac = prepared.get_flac_data()
+            with_flac(prepared, flac)
+            upload = len(flac)
+        trimmed = (len(samples) - len(kept)) / TARGET_RATE
+        self.record(len(audio.frame_data), upload, trimmed, time.perf_counter() - started)
+        return prepared
+
+    def record(self, captured, upload, trimmed, elapsed):
+        # Also fed with the measurements of phrases processed in worker processes
+        with self.lock:
+            self.phrases += 1
+            self.captured_bytes += captured
+            self.upload_bytes += upload
+            self.encode_seconds += elapsed
+            self.measurement = (captured, upload, trimmed, elapsed)
+            self.last = {"captured_bytes": captured, "upload_bytes": upload,
+                         "trimmed_seconds": round(trimmed, 2), "encode_ms": round(elapsed * 1000, 1)}
+
+    def trim(self, samples, threshold=None):
+        # Vectorised energy gate over short windows; without a threshold the
+        # quietest window of the phrase stands in for the noise floor
+        whole = len(samples) - len(samples) % self.window
+        if not whole:
+            return samples
+        energy = np.sqrt(np.square(samples[:whole]).reshape(-1, self.window).mean(axis=1))
+        if threshold is None:
+            threshold = energy.min() * self.ratio
+        voiced = np.flatnonzero(energy > max(threshold, self.min_threshold))
+        if not len(voiced):
+            return samples
+        start = max(0, voiced[0] * self.window - self.margin)
+        end = min(len(samples), (voiced[-1] + 1) * self.window + self.margin)
+        return samples[start:end]
+
+    def metrics(self):
+        with self.lock:
+            if not self.phrases:
+                return {}
+            metrics = dict(self.last)
+            metrics["bytes_per_phrase"] = self.upload_bytes // self.phrases
+            metrics["compression"] = round(self.captured_bytes / max(self.upload_bytes, 1), 1)
+            metrics["encode_ms_avg"] = round(self.encode_seconds / self.phrases * 1000, 1)
+            return metrics
+
+
+def to_samples(frames, sample_width):
+    # Mono PCM bytes to float samples on the 16-bit scale
+    samples = np.frombuffer(frames, dtype=DTYPES[sample_width]).astype(np.float64)
+    return samples * 2.0 ** (8 * (TARGET_WIDTH - sample_width))
+
+
+def resample(samples, rate, target):
+    if rate == target or not len(samples):
+        return samples
+    if rate > target:
+        # Average away what the lower rate can't hold before dropping samples
+        width = math.ceil(rate / target)
+        if width > 1:
+            samples = np.convolve(samples, np.full(width, 1.0 / width), mode="same")
+    count = int(len(samples) * target / rate)
+    return np.interp(np.arange(count) * (rate / target), np.arange(len(samples)), samples)
+
+
+def with_flac(audio, flac):
+    # recognize_google encodes whatever it is given; hand it these bytes instead
+    encode = audio.get_flac_data
+
+    def get_flac_data(convert_rate=None, convert_width=None):
+        if convert_rate in (None, audio.sample_rate) and convert_width in (None, audio.sample_width):
+            return flac
+        return encode(convert_rate, convert_width)
+
+    audio.get_flac_data = get_flac_data
+    return audio
@@ -0,0 +1,107 @@
+import os
+import threading
+
+from .lazy import lazy_import
+
+pocketsphinx = lazy_import("pocketsphinx")
+sr = lazy_import("speech_recognition")
+
+
+class RecognizerBackend:
+    # A speech-to-text engine. transcribe() returns a list of
+    # (transcript, confidence) alternatives, best first, and raises
+    # sr.UnknownValueError when nothing was understood. Confidence is None
+    # when the engine doesn't report one. uploads_flac says whether the
+    # engine sends FLAC, which can then be encoded ahead of time.
+    uploads_flac = False
+
+    def __init__(self, recognizer, language="en-US"):
+        self.recognizer = recognizer
+        self.language = language
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+    def warm(self):
+        # Loads whatever the engine needs before the first phrase arrives
+        pass
+
+
+class GoogleBackend(RecognizerBackend):
+    uploads_flac = True
+
+    def transcribe(self, audio):
+        response = self.recognizer.recognize_google(audio, language=self.language, show_all=True)
+        if not response or 'alternative' not in response:
+            raise sr.UnknownValueError()
+        return [(alternative['transcript'], alternative.get('confidence'))
+                for alternative in response['alternative'] if 'transcript' in alternative]
+
+
+class SphinxBackend(RecognizerBackend):
+    # Runs CMU PocketSphinx locally; needs the pocketsphinx package but no
+    # network. recognize_sphinx() loads the models again for every phrase,
+    # so one decoder is kept and reused instead.
+    def __init__(self, recognizer, language="en-US"):
+        super().__init__(recognizer, language)
+        self.decoder = None
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio):
+        with self.lock:
+            if self.decoder is None:
+                self.decoder = sphinx_decoder(self.language)
+            text = decode(self.decoder, audio)
+        if not text:
+            raise sr.UnknownValueError()
+        return [(text, None)]
+
+    def warm(self):
+        try:
+            with self.lock:
+                if self.decoder is None:
+                    self.decoder = sphinx_decoder(self.language)
+        except sr.RequestError:
+            # Reported when the first phrase is transcribed
+            pass
+
+
+def sphinx_decoder(language="en-US", **search):
+    # A PocketSphinx decoder for the models speech_recognition ships for the
+    # language. search sets the search mode, e.g. kws= for a keyword list
+    # file; by default the language model is used. Loading the models takes
+    # a while, so callers keep the decoder.
+    directory = os.path.join(os.path.dirname(os.path.realpath(sr.__file__)), "pocketsphinx-data", language)
+    if not os.path.isdir(directory):
+        raise sr.RequestError(f"missing PocketSphinx language data directory: \"{directory}\"")
+    search = search or {"lm": os.path.join(directory, "language-model.lm.bin")}
+    try:
+        return pocketsphinx.Decoder(hmm=os.path.join(directory, "acoustic-model"),
+                                    dict=os.path.join(directory, "pronounciation-dictionary.dict"),
+                                    logfn=os.devnull, **search)
+    except ImportError:
+        raise sr.RequestError("missing PocketSphinx module: ensure that PocketSphinx is set up correctly.")
+
+
+def decode(decoder, audio):
+    # Runs a whole phrase through the decoder; returns what it heard or None
+    decoder.start_utt()
+    decoder.process_raw(audio.get_raw_data(convert_rate=16000, convert_width=2), False, True)
+    decoder.end_utt()
+    hypothesis = decoder.hyp()
+    return hypothesis.hypstr if hypothesis is not None else None
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "sphinx": SphinxBackend,
+}
+
+
+def make_backend(recognizer, language="en-US", name=None):
+    # JARVIS_RECOGNIZER picks the engine when no name is given
+    name = name or os.environ.get("JARVIS_RECOGNIZER", "google")
+    try:
+        return BACKENDS[name](recognizer, language)
+    except KeyError:
+        raise ValueError(f"Unknown recognizer backend '{name}', choose from {', '.join(BACKENDS)}")
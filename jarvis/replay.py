@@ -0,0 +1,108 @@
+import os
+import time
+import wave
+
+from .lazy import lazy_import
+from .noise import DTYPES
+from .preprocess import TARGET_WIDTH, resample, to_samples
+
+np = lazy_import("numpy")
+
+sr = lazy_import("speech_recognition")
+
+
+class WavReplaySource:
+    # Stands in for sr.Microphone: plays back every .wav file in a directory,
+    # in name order, with a stretch of silence after each one so the phrase
+    # capture sees a clean end of utterance. With realtime=False the frames
+    # are produced as fast as they are read.
+    def __init__(self, directory, realtime=True, loop=False, gap=1.0, sample_rate=16000, chunk_size=1024):
+        self.paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.lower().endswith(".wav"))
+        if not self.paths:
+            raise ValueError(f"No .wav files found in {directory}")
+        self.realtime = realtime
+        self.loop = loop
+        self.gap = gap
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = chunk_size
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = WavReplayStream(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+
+class WavReplayStream:
+    def __init__(self, source):
+        self.source = source
+        self.pending = b""
+        self.files = self._files()
+        self.started = time.monotonic()
+        self.sent = 0
+
+    def read(self, size):
+        source = self.source
+        wanted = size * source.SAMPLE_WIDTH
+        while len(self.pending) < wanted:
+            chunk = next(self.files, None)
+            if chunk is None:
+                break
+            self.pending += chunk
+        frame, self.pending = self.pending[:wanted], self.pending[wanted:]
+
+        if source.realtime and frame:
+            # Hold each frame back until the moment a real microphone would deliver it
+            self.sent += len(frame)
+            due = self.started + self.sent / (source.SAMPLE_RATE * source.SAMPLE_WIDTH)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return frame
+
+    def _files(self):
+        source = self.source
+        silence = bytes(int(source.gap * source.SAMPLE_RATE) * source.SAMPLE_WIDTH)
+        while True:
+            for path in source.paths:
+                yield load_wav(path, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+                yield silence
+            if not source.loop:
+                return
+
+
+def load_wav(path, sample_rate, sample_width):
+    # Converts the file to mono PCM at the requested rate and width
+    with wave.open(path, "rb") as wav:
+        frames = wav.readframes(wav.getnframes())
+        width, channels, rate = wav.getsampwidth(), wav.getnchannels(), wav.getframerate()
+    if width == 1:
+        # 8-bit WAV samples are unsigned
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float64) - 128) * 256
+    elif width == 3:
+        # No 24-bit dtype; the top two bytes of each sample are close enough
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        samples = to_samples(raw[:, 1:].tobytes(), 2)
+    else:
+        samples = to_samples(frames, width)
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+        # Stereo is mixed down; of more channels only the first is kept
+        samples = samples.mean(axis=1) if channels == 2 else samples[:, 0]
+    samples = resample(samples, rate, sample_rate) / 2.0 ** (8 * (TARGET_WIDTH - sample_width))
+    limit = 2 ** (8 * sample_width - 1)
+    return np.clip(np.rint(samples), -limit, limit - 1).astype(DTYPES[sample_width]).tobytes()
+
+
+def open_audio_source():
+    # JARVIS_AUDIO_DIR replays recorded phrases instead of using the microphone;
+    # JARVIS_REPLAY_SPEED=max replays them without real-time pacing
+    directory = os.environ.get("JARVIS_AUDIO_DIR")
+    if directory:
+        realtime = os.environ.get("JARVIS_REPLAY_SPEED", "realtime") != "max"
+        return WavReplaySource(directory, realtime=realtime)
+    return sr.Microphone()
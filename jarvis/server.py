@@ -0,0 +1,245 @@
+# Headless server that runs one assistant configuration for many clients
+# at once, e.g. several kiosks talking to one box. Every connection is a
+# session with its own intents, running commands and spoken language; the
+# wiki and translation caches are shared by all of them. Recognition runs
+# in a pool of processes so it scales with the number of cores.
+#
+#   python -m jarvis.server j4.py --port 8765
+#   python -m jarvis.server j4.py --unix /tmp/jarvis.sock --processes 4
+#
+# Messages are JSON objects, one per line. From the client:
+#   {"type": "text", "text": "search cats", "language": "en"}
+#   {"type": "audio", "data": "<base64 PCM>", "sample_rate": 16000, "sample_width": 2}
+#   {"type": "end_audio"}   the audio stream is over; a phrase still in progress is recognized
+#   {"type": "stop"}        cancels the running commands
+# From the server:
+#   {"type": "heard", "text": "...", "language": "en"}
+#   {"type": "say", "text": "...", "language": "en"}
+#   {"type": "busy", "busy": true}
+#   {"type": "error", "error": "..."}
+#   {"type": "bye"}
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import queue
+import runpy
+
+from . import tracing
+from .assistant import Assistant, make_summary_cache
+from .speech import SpeechRecognitionThread
+from .translation import TranslationService
+from .workers import WorkerPool
+
+# Longest line a client may send; audio chunks are base64 encoded
+MAX_MESSAGE = 4 * 1024 * 1024
+
+class StreamedAudio:
+    # Audio source for SpeechRecognitionThread fed from a client connection.
+    # read() blocks until the client has sent enough audio and returns b""
+    # once the stream has been ended.
+    def __init__(self, sample_rate=16000, sample_width=2, chunk_size=1024):
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = sample_width
+        self.CHUNK = chunk_size
+        self.chunks = queue.Queue()
+        self.pending = b""
+        self.ended = False
+        self.stream = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def feed(self, data):
+        self.chunks.put(data)
+
+    def end(self):
+        self.chunks.put(None)
+
+    def read(self, size):
+        wanted = size * self.SAMPLE_WIDTH
+        while len(self.pending) < wanted and not self.ended:
+            chunk = self.chunks.get()
+            if chunk is None:
+                self.ended = True
+            else:
+                self.pending += chunk
+        frame, self.pending = self.pending[:wanted], self.pending[wanted:]
+        return frame
+
+
+class ClientOutput:
+    # Sessions send what they say to the client instead of speaking it
+    def start(self):
+        pass
+
+    def prerender(self, texts, language):
+        pass
+
+    def stop(self):
+        pass
+
+
+class Session(Assistant):
+    def __init__(self, server, number, writer, loop):
+        self.server = server
+        self.number = number
+        self.writer = writer
+        self.loop = loop
+        self.closed = False
+        self.audio = None
+        Assistant.__init__(self, server.config, summary_cache=server.summary_cache, translator=server.translator,
+                           workers=server.workers)
+
+    def send(self, message):
+        # Safe to call from any thread
+        if not self.closed:
+            self.loop.call_soon_threadsafe(self._write, json.dumps(message) + "\n")
+
+    def handle(self, message):
+        try:
+            self._handle(message)
+        except Exception as e:
+            self.send({"type": "error", "error": f"{type(e).__name__}: {e}"})
+
+    def _handle(self, message):
+        kind = message.get("type")
+        if kind == "text":
+            with tracing.bind(tracing.new_turn()):
+                self.on_text_detected(message["text"], message.get("language") or 'en')
+        elif kind == "audio":
+            if self.audio is None:
+                self.audio = StreamedAudio(message.get("sample_rate", 16000), message.get("sample_width", 2))
+                self.start_listening()
+            self.audio.feed(base64.b64decode(message["data"]))
+        elif kind == "end_audio":
+            if self.audio is not None:
+                self.audio.end()
+                self.audio = None
+                self.speech_thread = None
+        elif kind == "stop":
+            self.stop_processing()
+        else:
+            self.send({"type": "error", "error": f"unknown message type {kind!r}"})
+
+    def start_listening(self):
+        # No spoken announcement; the client started streaming on its own
+        self.speech_thread = self.make_speech_input()
+        self.speech_thread.start()
+
+    def on_text_detected(self, text, language, alternatives=None):
+        self.send({"type": "heard", "text": text, "language": language})
+        Assistant.on_text_detected(self, text, language, alternatives)
+
+    def say(self, text, language, priority=None, **options):
+        self.send({"type": "say", "text": text, "language": language})
+
+    def close(self):
+        self.closed = True
+        if self.audio is not None:
+            self.audio.end()
+        self.shutdown()
+
+    def make_speech_input(self):
+        config = self.config
+        return SpeechRecognitionThread(self.on_text_detected, config.recognizer_language, config.detect_language,
+                                       config.phrase_time_limit, config.calibration,
+                                       source=self.audio, pool=self.workers, gate=self.speech_gate)
+
+    def make_speech_output(self):
+        return ClientOutput()
+
+    def busy_changed(self, busy):
+        self.send({"type": "busy", "busy": busy})
+
+    def quit(self):
+        self.send({"type": "bye"})
+        self.loop.call_soon_threadsafe(self.writer.close)
+
+    def _write(self, line):
+        if not self.writer.is_closing():
+            self.writer.write(line.encode("utf-8"))
+
+
+class AssistantServer:
+    def __init__(self, config, processes=None):
+        self.config = config
+        self.summary_cache = make_summary_cache(config)
+        self.translator = TranslationService() if config.translate else None
+        self.workers = WorkerPool(config.recognizer_language, processes, config.compress_audio, config.detect_language)
+        self.sessions = set()
+        self.numbers = itertools.count(1)
+
+    async def serve_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        # Setting up a session starts threads, so keep it off the event loop
+        session = await loop.run_in_executor(None, Session, self, next(self.numbers), writer, loop)
+        self.sessions.add(session)
+        print(f"Session {session.number} connected ({len(self.sessions)} active)")
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError) as e:
+                    print(f"Session {session.number} read failed; {e}")
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    session.send({"type": "error", "error": "messages must be JSON, one per line"})
+                    continue
+                if not isinstance(message, dict):
+                    session.send({"type": "error", "error": "expected a JSON object"})
+                    continue
+                # Intent handlers and plugins may block, so they get a thread
+                await loop.run_in_executor(None, session.handle, message)
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    break
+        finally:
+            self.sessions.discard(session)
+            await loop.run_in_executor(None, session.close)
+            writer.close()
+            print(f"Session {session.number} closed ({len(self.sessions)} active)")
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        if path:
+            server = await asyncio.start_unix_server(self.serve_client, path, limit=MAX_MESSAGE)
+            print(f"Listening on {path}")
+        else:
+            server = await asyncio.start_server(self.serve_client, host, port, limit=MAX_MESSAGE)
+            print(f"Listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.workers.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an assistant to many clients over local sockets")
+    parser.add_argument("script", help="assistant whose CONFIG to serve, e.g. j4.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--processes", type=int, help="recognition worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    server = AssistantServer(runpy.run_path(args.script)["CONFIG"], args.processes)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import threading
+import time
+
+from .capture import PhraseCapture, RecognitionPool
+from .language_id import LanguageIdentifier
+from .lazy import lazy_import
+from .preprocess import AudioPreprocessor
+from .recognizers import make_backend
+from .replay import open_audio_source
+from .startup import mark
+from . import tracing
+
+sr = lazy_import("speech_recognition")
+
+
+class SpeechRecognitionThread(threading.Thread):
+    # Captures phrases and hands each recognized one to callback(text, language,
+    # alternatives), where alternatives are all of the recognizer's
+    # (transcript, confidence) guesses, best first.
+    # The language is 'en' unless detect_language is set. By default audio
+    # comes from open_audio_source() and goes to the configured recognizer
+    # backend; source replaces the first, and with a WorkerPool phrases are
+    # preprocessed and recognized in its processes instead. With compress
+    # set, phrases are trimmed and resampled before they are recognized
+    # (a pool decides that for itself). A SpeechGate decides which phrases
+    # are recognized at all.
+    def __init__(self, callback, language="en-US", detect_language=False, phrase_time_limit=5, calibration=0.5,
+                 source=None, pool=None, compress=True, gate=None):
+        threading.Thread.__init__(self, daemon=True)
+        self.callback = callback
+        self.language = language
+        self.detect_language = detect_language
+        self.phrase_time_limit = phrase_time_limit
+        self.calibration = calibration
+        self.source = source
+        self.pool = pool
+        self.gate = gate
+        self.compress = compress
+        self.preprocessor = None
+        self.capture = None
+        self.is_running = True
+
+    def run(self):
+        # Everything that needs speech_recognition is set up here, off the Tk thread
+        self.recognizer = sr.Recognizer()
+        detect = None
+        if self.pool is None:
+            backend = make_backend(self.recognizer, self.language)
+            self.transcribe = backend.transcribe
+            self.preprocessor = AudioPreprocessor(backend.uploads_flac)
+        else:
+            # Only collects the measurements of phrases processed in the pool
+            self.preprocessor = AudioPreprocessor(encode=False)
+            detect = self.pool.detect_languages
+        self.language_id = LanguageIdentifier(hint=self.language, detect=detect) if self.detect_language else None
+        self.workers = RecognitionPool(self.recognize, self.deliver)
+        self.capture = PhraseCapture(self.recognizer, self.phrase_captured, self.phrase_time_limit,
+                                     calibration=self.calibration, on_ready=lambda: mark("listening"))
+        if not self.is_running:
+            return
+
+        self.workers.start()
+        with self.source or open_audio_source() as source:
+            print("Listening...")
+            self.capture.run(source)
+        self.workers.stop()
+
+    def phrase_captured(self, audio):
+        # Every captured phrase starts a new turn
+        turn = tracing.new_turn()
+        tracing.record("capture", len(audio.frame_data) / (audio.sample_rate * audio.sample_width), turn)
+        self.workers.submit((turn, time.monotonic(), audio))
+
+    def recognize(self, item):
+        turn, queued, audio = item
+        with tracing.bind(turn):
+            tracing.record("recognition_wait", time.monotonic() - queued)
+            if self.gate is not None:
+                duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+                if not self.gate.admit(audio, queued - duration, queued):
+                    return None
+            return self._recognize(audio, turn)
+
+    def _recognize(self, audio, turn):
+        print("Audio captured, recognizing...")
+        try:
+            if self.pool is not None:
+                with tracing.span("recognition"):
+                    alternatives, measurement = self.pool.recognize(audio, self.recognizer.energy_threshold)
+                if measurement is not None:
+                    self.preprocessor.record(*measurement)
+                    tracing.record("encode", measurement[3])
+            else:
+                if self.compress:
+                    with tracing.span("encode"):
+                        audio = self.preprocessor.process(audio, self.recognizer.energy_threshold)
+                with tracing.span("recognition"):
+                    alternatives = self.transcribe(audio)
+            text = alternatives[0][0]
+            print(f"Recognized: {text}")
+            with tracing.span("language_id"):
+                language = self.language_id.identify(text) if self.language_id else 'en'
+            return alternatives, language, turn
+        except sr.UnknownValueError:
+            print("Could not understand audio")
+        except sr.RequestError as e:
+            print(f"Could not request results; {e}")
+
+    def deliver(self, result):
+        alternatives, language, turn = result
+        with tracing.bind(turn):
+            self.callback(alternatives[0][0], language, alternatives)
+
+    def metrics(self):
+        metrics = self.capture.metrics() if self.capture is not None else {}
+        if self.preprocessor is not None:
+            metrics.update(self.preprocessor.metrics())
+        if self.gate is not None:
+            metrics.update(self.gate.metrics())
+        return metrics
+
+    def stop(self):
+        self.is_running = False
+        if self.capture is not None:
+            self.capture.stop()
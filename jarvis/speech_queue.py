@@ -0,0 +1,135 @@
+import heapq
+import itertools
+import threading
+import time
+
+# Lower numbers are spoken first; items of the same priority in the order they were queued
+URGENT = 0  # confirmations of "stop" and the like
+STATUS = 1  # "Searching for ...", "Listening started"
+ANSWER = 2
+BACKGROUND = 3  # prerendering; never dropped by barge-in
+
+
+class SpeechItem:
+    def __init__(self, text, language, turn=None, priority=ANSWER, key=None, ttl=None, render_only=False):
+        self.text = text
+        self.language = language
+        self.turn = turn
+        self.priority = priority
+        self.key = key
+        self.queued = time.monotonic()
+        self.expires = self.queued + ttl if ttl is not None else None
+        self.render_only = render_only
+        self.cancelled = False
+        self.interrupted = False
+
+
+class SpeechQueue:
+    # What the assistant still has to say, ordered by priority. get() blocks
+    # until there is something to say or the queue is closed; there is no
+    # polling. Pending items are dropped when they expire, when a later item
+    # of the same turn replaces them (same key, or supersedes=key), or when
+    # the user barges in with a new turn. The item being spoken is
+    # interrupted by calling on_interrupt(), which the speech thread sets.
+    def __init__(self):
+        self.heap = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.unfinished = 0
+        self.current = None
+        self.closed = False
+        self.on_interrupt = None
+        self.dropped = 0
+        self.expired = 0
+        self.coalesced = 0
+
+    def put(self, text, language, turn=None, priority=ANSWER, key=None, ttl=None, supersedes=None, render_only=False):
+        item = SpeechItem(text, language, turn, priority, key, ttl, render_only)
+        with self.condition:
+            replaced = {name for name in (key, supersedes) if name is not None}
+            if replaced:
+                self.coalesced += self._drop(lambda pending: pending.turn == turn and pending.key in replaced)
+            heapq.heappush(self.heap, (priority, next(self.sequence), item))
+            self.unfinished += 1
+            self.condition.notify_all()
+        return item
+
+    def get(self):
+        # Returns the next SpeechItem, or None once the queue is closed
+        with self.condition:
+            while not self.closed:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+                _, _, item = heapq.heappop(self.heap)
+                if item.cancelled:
+                    continue
+                if item.expires is not None and item.expires < time.monotonic():
+                    self.expired += 1
+                    self._finished()
+                    continue
+                self.current = item
+                return item
+            return None
+
+    def task_done(self):
+        with self.condition:
+            self.current = None
+            self._finished()
+
+    def join(self):
+        with self.condition:
+            while self.unfinished and not self.closed:
+                self.condition.wait()
+
+    def barge_in(self, turn=None):
+        # The user has started a new turn: everything queued for any other
+        # turn is dropped and whatever is being said is cut off
+        with self.condition:
+            self.dropped += self._drop(lambda pending: pending.turn != turn and pending.priority != BACKGROUND)
+            current = self.current
+            interrupt = current is not None and current.turn != turn and not current.render_only
+            if interrupt:
+                current.interrupted = True
+        if interrupt and self.on_interrupt is not None:
+            self.on_interrupt()
+
+    def clear(self):
+        # Drops everything that is pending and stops the current item
+        self.barge_in(turn=object())
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            if self.current is not None:
+                self.current.interrupted = True
+            self.condition.notify_all()
+        if self.on_interrupt is not None:
+            self.on_interrupt()
+
+    def stats(self):
+        with self.condition:
+            return {
+                "pending": self.unfinished - (self.current is not None),
+                "dropped": self.dropped,
+                "expired": self.expired,
+                "coalesced": self.coalesced,
+            }
+
+    def _drop(self, matches):
+        count = 0
+        for _, _, item in self.heap:
+            if not item.cancelled and matches(item):
+                item.cancelled = True
+                count += 1
+        if count:
+            self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+            heapq.heapify(self.heap)
+            self.unfinished -= count
+            self.condition.notify_all()
+        return count
+
+    def _finished(self):
+        self.unfinished -= 1
+        if not self.unfinished:
+            self.condition.notify_all()
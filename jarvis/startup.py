@@ -0,0 +1,11 @@
+import os
+import time
+
+# Set by jarvis.bench_startup in the processes it launches
+BENCHMARK = bool(os.environ.get("JARVIS_STARTUP_BENCH"))
+
+
+def mark(milestone):
+    # Reports a startup milestone ("window", "listening") to the benchmark
+    if BENCHMARK:
+        print(f"JARVIS_STARTUP {milestone} {time.perf_counter():.6f}", flush=True)
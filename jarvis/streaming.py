@@ -0,0 +1,20 @@
+import re
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text):
+    return [sentence for sentence in SENTENCE_END.split(text.strip()) if sentence]
+
+
+def stream_sentences(text, language='en', translate_many=None):
+    # Yields the response one sentence at a time so the first one can be
+    # spoken while the rest is still being translated. The first sentence is
+    # translated on its own; the remainder goes to the translator in one batch.
+    sentences = split_sentences(text)
+    if translate_many is None or language == 'en':
+        yield from sentences
+        return
+    yield from translate_many(sentences[:1], language)
+    if len(sentences) > 1:
+        yield from translate_many(sentences[1:], language)
@@ -0,0 +1,252 @@
+# Local index of article titles used to fix misheard search queries before
+# they go to the network. Build it from a title list such as
+# enwiki-latest-all-titles-in-ns0.gz (one title per line, optionally
+# followed by a tab and a popularity count):
+#
+#   python -m jarvis.titles build enwiki-latest-all-titles-in-ns0.gz --language en
+#   python -m jarvis.titles match "albert einstain"
+import argparse
+import difflib
+import gzip
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from operator import itemgetter
+
+from .cache import CACHE_DIR, normalize_query
+
+TITLES_PATH = os.path.join(CACHE_DIR, "titles.db")
+
+
+class TitleMatch:
+    # certain is False when a better title may have been left out of the
+    # search, or another title is just as close
+    def __init__(self, title, score, certain=True):
+        self.title = title
+        self.score = score
+        self.certain = certain
+
+    def __repr__(self):
+        return f"TitleMatch({self.title!r}, {self.score:.2f})"
+
+
+class TitleIndex:
+    # Titles live in SQLite with an FTS5 trigram index, so only the pages a
+    # lookup touches are read (through mmap) and memory stays small however
+    # many titles there are. match() gathers the titles sharing the most
+    # trigrams with the query, the most popular first among those sharing
+    # equally many, and ranks them by edit similarity, then by popularity.
+    # postings caps how many index entries one lookup reads, and ties how
+    # many equally good titles are compared by popularity.
+    def __init__(self, path=TITLES_PATH, candidates=40, postings=100000, ties=2000):
+        self.path = path
+        self.candidates = candidates
+        self.postings = postings
+        self.ties = ties
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA mmap_size = 1073741824")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS titles (
+                id INTEGER PRIMARY KEY, language TEXT NOT NULL, title TEXT NOT NULL, key TEXT NOT NULL,
+                popularity REAL NOT NULL DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS titles_key ON titles (language, key);
+            CREATE VIRTUAL TABLE IF NOT EXISTS titles_grams USING fts5(
+                key, content='titles', content_rowid='id', tokenize='trigram', detail='none');
+            CREATE VIRTUAL TABLE IF NOT EXISTS temp.titles_vocab USING fts5vocab(main, titles_grams, 'row');
+        """)
+
+    def match(self, query, language='en'):
+        # Best matching title for the query, or None if nothing is similar at all
+        key = normalize_query(query)
+        if not key:
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT title FROM titles WHERE language = ? AND key = ? "
+                                    "ORDER BY popularity DESC LIMIT 1", (language, key)).fetchone()
+            if row is not None:
+                return TitleMatch(row[0], 1.0)
+            rows, dropped = self._candidates(key, language)
+        best = None
+        tied = False
+        for title, title_key, popularity, shared in rows:
+            score = difflib.SequenceMatcher(None, key, title_key).ratio()
+            ranking = (round(score, 2), popularity)
+            if best is None or ranking > best[0]:
+                tied = best is not None and ranking[0] == best[0][0] and title_key != best[2]
+                best = (ranking, TitleMatch(title, score), title_key, shared)
+            elif ranking[0] == best[0][0] and title_key != best[2]:
+                tied = True
+        if best is None:
+            return None
+        # Sure only if no title left out could share as many trigrams
+        best[1].certain = best[3] > dropped and not tied
+        return best[1]
+
+    def contains(self, query, language='en'):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM titles WHERE language = ? AND key = ?",
+                                     (language, normalize_query(query))).fetchone() is not None
+
+    def _candidates(self, key, language):
+        # Titles sharing the most trigrams with key, as (title, key,
+        # popularity, shared trigrams), and the most trigrams a title left out
+        # could share. Trigrams are read rarest first and the common ones
+        # ("the", "ion") are skipped once enough postings have been read; a
+        # typo only spoils the few around it.
+        grams = sorted({key[i:i + 3] for i in range(len(key) - 2)})
+        if not grams:
+            return [], 0
+        frequencies = self.conn.execute(
+            f"SELECT term, doc FROM temp.titles_vocab WHERE term IN ({', '.join('?' * len(grams))})", grams).fetchall()
+        shared = Counter()
+        read = 0
+        dropped = 0
+        for number, (gram, frequency) in enumerate(sorted(frequencies, key=lambda item: item[1])):
+            if read and read + frequency > self.postings:
+                dropped = len(frequencies) - number
+                break
+            read += frequency
+            shared.update(map(itemgetter(0), self.conn.execute(
+                "SELECT rowid FROM titles_grams WHERE titles_grams MATCH ?", ('"' + gram.replace('"', '""') + '"',))))
+        # Titles of other languages share the trigram index, so read a few extra
+        limit = self.candidates * 4
+        best = [rowid for rowid, _ in shared.most_common(limit)]
+        if len(best) < len(shared):
+            # The cap cuts through the titles sharing the fewest trigrams of
+            # those taken; keep the most popular of them rather than any
+            cut = shared[best[-1]]
+            best = [rowid for rowid in best if shared[rowid] > cut]
+            tied = [rowid for rowid, count in shared.items() if count == cut]
+            best += self._most_popular(tied[:self.ties], language, limit - len(best))
+            dropped += cut
+        rows = []
+        for rowid in best:
+            row = self.conn.execute("SELECT title, key, popularity FROM titles WHERE id = ? AND language = ?",
+                                    (rowid, language)).fetchone()
+            if row is not None:
+                rows.append(row + (shared[rowid],))
+                if len(rows) == self.candidates:
+                    break
+        return rows, dropped
+
+    def _most_popular(self, rowids, language, limit, chunk=500):
+        found = []
+        for start in range(0, len(rowids), chunk):
+            part = rowids[start:start + chunk]
+            # Filtering on language in SQL would make SQLite scan the language's titles instead of these rows
+            found += [(rowid, popularity) for rowid, popularity, title_language in self.conn.execute(
+                f"SELECT id, popularity, language FROM titles WHERE id IN ({', '.join('?' * len(part))})", part)
+                if title_language == language]
+        return [rowid for rowid, _ in heapq.nlargest(limit, found, key=itemgetter(1))]
+
+    def count(self, language=None):
+        with self.lock:
+            if language is None:
+                return self.conn.execute("SELECT count(*) FROM titles").fetchone()[0]
+            return self.conn.execute("SELECT count(*) FROM titles WHERE language = ?", (language,)).fetchone()[0]
+
+    def build(self, titles, language='en', batch_size=50000):
+        # titles yields (title, popularity) pairs; replaces the titles of the language
+        with self.lock:
+            conn = self.conn
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("DELETE FROM titles WHERE language = ?", (language,))
+            total = 0
+            batch = []
+            for title, popularity in titles:
+                batch.append((language, title, normalize_query(title), popularity))
+                if len(batch) >= batch_size:
+                    total += self._insert(batch)
+                    batch = []
+            total += self._insert(batch)
+            conn.execute("INSERT INTO titles_grams (titles_grams) VALUES ('rebuild')")
+            conn.execute("INSERT INTO titles_grams (titles_grams) VALUES ('optimize')")
+            conn.commit()
+            conn.execute("PRAGMA synchronous = FULL")
+            return total
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _insert(self, batch):
+        self.conn.executemany("INSERT INTO titles (language, title, key, popularity) VALUES (?, ?, ?, ?)", batch)
+        return len(batch)
+
+
+class QueryCorrector:
+    # Decides what to do with a search query before it goes to the wiki:
+    # search for it as it is, search for a close title instead, or ask the
+    # user whether they meant a title that is only somewhat similar, or that
+    # the index can't be sure is the closest.
+    def __init__(self, index, correct_above=0.85, suggest_above=0.7):
+        self.index = index
+        self.correct_above = correct_above
+        self.suggest_above = suggest_above
+        self.languages = {}
+
+    def resolve(self, query, language='en'):
+        # Returns (query to search for, title to suggest instead); at most one is set
+        if not self._indexed(language):
+            return query, None
+        match = self.index.match(query, language)
+        if match is None or match.score < self.suggest_above:
+            return query, None
+        if match.score >= self.correct_above and match.certain:
+            return match.title, None
+        return None, match.title
+
+    def known(self, query, language='en'):
+        # Whether the query is exactly the title of an article
+        return self._indexed(language) and self.index.contains(query, language)
+
+    def _indexed(self, language):
+        if language not in self.languages:
+            self.languages[language] = self.index.count(language) > 0
+        return self.languages[language]
+
+
+def read_titles(path):
+    # One title per line, with underscores for spaces as in the Wikipedia
+    # title dumps, optionally followed by a tab and a popularity count
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for number, line in enumerate(f):
+            line = line.rstrip("\n")
+            if not line or (number == 0 and line == "page_title"):
+                continue
+            title, _, popularity = line.partition("\t")
+            yield title.replace("_", " "), float(popularity) if popularity else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the fuzzy title index")
+    parser.add_argument("--index", default=TITLES_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index a title list (.txt or .gz)")
+    build.add_argument("source")
+    build.add_argument("--language", default="en")
+    match = commands.add_parser("match", help="find the closest title")
+    match.add_argument("query")
+    match.add_argument("--language", default="en")
+    args = parser.parse_args()
+
+    index = TitleIndex(args.index)
+    started = time.perf_counter()
+    if args.command == "build":
+        count = index.build(read_titles(args.source), args.language)
+        print(f"Indexed {count} titles in {time.perf_counter() - started:.1f} s")
+    else:
+        print(index.match(args.query, args.language))
+        print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import queue
+
+
+class TkDispatcher:
+    # Tk widgets may only be touched from the thread running mainloop().
+    # call() can be used from any thread; a master.after() tick runs the
+    # queued calls on the Tk thread, followed by every tick handler.
+    def __init__(self, master, interval=50):
+        self.master = master
+        self.interval = interval
+        self.calls = queue.SimpleQueue()
+        self.tick_handlers = []
+        self.master.after(self.interval, self._tick)
+
+    def call(self, fn, *args, **kwargs):
+        self.calls.put((fn, args, kwargs))
+
+    def add_tick_handler(self, handler):
+        self.tick_handlers.append(handler)
+
+    def _tick(self):
+        while True:
+            try:
+                fn, args, kwargs = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                print(f"Error updating the window; {e}")
+        for handler in self.tick_handlers:
+            try:
+                handler()
+            except Exception as e:
+                print(f"Error updating the window; {e}")
+        self.master.after(self.interval, self._tick)
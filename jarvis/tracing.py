@@ -0,0 +1,132 @@
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Stages in the order a turn goes through them; stats() lists these first
+STAGES = ["capture", "recognition_wait", "gate", "encode", "recognition", "language_id", "intent", "command_wait", "titles",
+          "wiki", "translate", "prompt", "tts_wait", "synthesis", "playback", "speak", "response"]
+
+
+class Tracer:
+    # Records how long each stage of every turn takes. A turn starts when a
+    # phrase has been captured and is identified by an integer. The current
+    # turn is kept per thread; bind() hands it over to another thread. Each
+    # stage keeps the last `window` durations for its percentiles, and every
+    # span is also appended to export_path as one JSON object per line.
+    def __init__(self, window=1000, export_path=None):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.turns = itertools.count(1)
+        self.turn_started = OrderedDict()
+        self.responded = set()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.export = open(export_path, "a", buffering=1, encoding="utf-8") if export_path else None
+
+    def new_turn(self, started=None):
+        turn = next(self.turns)
+        with self.lock:
+            self.turn_started[turn] = started if started is not None else time.monotonic()
+            while len(self.turn_started) > 100:
+                old, _ = self.turn_started.popitem(last=False)
+                self.responded.discard(old)
+        self.local.turn = turn
+        return turn
+
+    def current_turn(self):
+        return getattr(self.local, "turn", None)
+
+    @contextmanager
+    def bind(self, turn):
+        previous = self.current_turn()
+        self.local.turn = turn
+        try:
+            yield turn
+        finally:
+            self.local.turn = previous
+
+    @contextmanager
+    def span(self, stage, turn=None):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(stage, time.monotonic() - start, turn)
+
+    def record(self, stage, seconds, turn=None):
+        if turn is None:
+            turn = self.current_turn()
+        with self.lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+            if self.export is not None:
+                self.export.write(json.dumps({
+                    "turn": turn, "stage": stage, "end": round(time.time(), 6), "duration": round(seconds, 6),
+                    "thread": threading.current_thread().name,
+                }) + "\n")
+
+    def responding(self, turn):
+        # Called when the assistant starts speaking; the first time for a turn
+        # records the time from the end of the phrase to the first reply
+        with self.lock:
+            started = self.turn_started.get(turn)
+            if started is None or turn in self.responded:
+                return
+            self.responded.add(turn)
+        self.record("response", time.monotonic() - started, turn)
+
+    def stats(self):
+        with self.lock:
+            snapshot = {stage: (sorted(samples), self.counts[stage]) for stage, samples in self.samples.items()}
+        order = STAGES + sorted(set(snapshot) - set(STAGES))
+        return {stage: {
+            "count": snapshot[stage][1],
+            "p50": percentile(snapshot[stage][0], 50),
+            "p95": percentile(snapshot[stage][0], 95),
+            "p99": percentile(snapshot[stage][0], 99),
+        } for stage in order if stage in snapshot}
+
+    def format_stats(self):
+        lines = [f"{'stage':<17}{'n':>6}{'p50':>8}{'p95':>8}{'p99':>8}"]
+        for stage, row in self.stats().items():
+            lines.append(f"{stage:<17}{row['count']:>6}" + "".join(f"{row[p] * 1000:>6.0f}ms" for p in ("p50", "p95", "p99")))
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+            self.turn_started.clear()
+            self.responded.clear()
+
+    def close(self):
+        if self.export is not None:
+            self.export.close()
+            self.export = None
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    # Nearest rank
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+# Spans are written to the file named by JARVIS_TRACE when it is set
+TRACER = Tracer(export_path=os.environ.get("JARVIS_TRACE") or None)
+
+new_turn = TRACER.new_turn
+current_turn = TRACER.current_turn
+bind = TRACER.bind
+span = TRACER.span
+record = TRACER.record
+responding = TRACER.responding
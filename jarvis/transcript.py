@@ -0,0 +1,53 @@
+import os
+import queue
+import tkinter as tk
+
+from .cache import CACHE_DIR
+
+
+class Transcript:
+    # Conversation log shown in a Text widget. append() may be called from
+    # any thread; lines are written to the widget in one batch per
+    # dispatcher tick with a single scroll. Only the newest max_lines lines
+    # are kept in the widget, older ones are moved to a log file.
+    def __init__(self, text_area, dispatcher, max_lines=500, log_path=None):
+        self.text_area = text_area
+        self.max_lines = max_lines
+        self.log_path = log_path or os.path.join(CACHE_DIR, "transcript.log")
+        self.pending = queue.SimpleQueue()
+        self.lines = 0
+        dispatcher.add_tick_handler(self.flush)
+
+    def append(self, line):
+        self.pending.put(line)
+
+    def flush(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return
+
+        text = "\n".join(batch) + "\n"
+        self.text_area.insert(tk.END, text)
+        self.lines += text.count("\n")
+
+        overflow = self.lines - self.max_lines
+        if overflow > 0:
+            end = f"{overflow + 1}.0"
+            spilled = self.text_area.get("1.0", end)
+            self.text_area.delete("1.0", end)
+            self.lines -= overflow
+            self.spill(spilled)
+        self.text_area.see(tk.END)
+
+    def spill(self, text):
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as log:
+                log.write(text)
+        except OSError as e:
+            print(f"Could not write transcript log; {e}")
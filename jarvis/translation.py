@@ -0,0 +1,129 @@
+import json
+import os
+import string
+import threading
+
+from .cache import CACHE_DIR, PersistentCache
+from .transport import shared_transport
+
+TRANSLATE_URL = "https://translate.googleapis.com/translate_a/single"
+
+# Fixed assistant messages; these are translated once per language and then
+# served from the cache. Fields in braces are filled in after translation.
+PROMPTS = [
+    "Listening started. How can I help you?",
+    "Listening stopped.",
+    "Processing stopped.",
+    "Searching for '{query}'...",
+    "I'm sorry, I can only perform searches at the moment. Please say 'search' followed by your query.",
+    "There are multiple results for '{query}'. Possible matches: {options}. Please be more specific.",
+    "Sorry, I couldn't find any information about '{query}'.",
+    "Did you mean '{title}'?",
+    "An error occurred while searching: {error}",
+]
+
+
+class TranslationService:
+    # on_warm(language, prompts) is called with the translated PROMPTS once a
+    # language has been warmed up
+    def __init__(self, path=None, ttl=30 * 24 * 3600, translator=None, on_warm=None):
+        if path is None:
+            path = os.path.join(CACHE_DIR, "translations.db")
+        self.store = PersistentCache(path, "translations", memory_size=1024, disk_size=50000)
+        self.ttl = ttl
+        self.translator = translator or GoogleTranslateClient()
+        self.on_warm = on_warm
+        self.warmed = set()
+        self.lock = threading.Lock()
+
+    def translate(self, text, dest):
+        return self.translate_many([text], dest)[0]
+
+    def translate_many(self, texts, dest):
+        texts = list(texts)
+        if dest == 'en' or not texts:
+            return texts
+
+        results = [self.store.get(json.dumps([dest, text])) for text in texts]
+        missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        if not missing:
+            return results
+
+        translated = self._backend(missing, dest)
+        if translated is None:
+            # Fall back to an expired translation or the original text, but don't cache the failure
+            stale = {text: self.store.get_stale(json.dumps([dest, text])) or text for text in missing}
+            return [stale[text] if result is None else result for text, result in zip(texts, results)]
+        found = dict(zip(missing, translated))
+        for text, result in found.items():
+            self.store.put(json.dumps([dest, text]), result, self.ttl)
+        return [found[text] if result is None else result for text, result in zip(texts, results)]
+
+    def prompt(self, template, dest, **fields):
+        self.warm(dest)
+        translated = self.translate(template, dest)
+        # The translator may mangle the placeholders; if so translate the filled-in text instead
+        if placeholders(translated) == placeholders(template):
+            try:
+                return translated.format(**fields)
+            except (KeyError, IndexError, ValueError):
+                pass
+        return self.translate(template.format(**fields), dest)
+
+    def warm(self, *languages):
+        with self.lock:
+            pending = [language for language in languages if language != 'en' and language not in self.warmed]
+            self.warmed.update(pending)
+        for language in pending:
+            threading.Thread(target=self._warm, args=(language,), daemon=True).start()
+
+    def stats(self):
+        return self.store.stats()
+
+    def _warm(self, language):
+        prompts = self.translate_many(PROMPTS, language)
+        if self.on_warm is not None:
+            self.on_warm(language, prompts)
+
+    def _backend(self, texts, dest):
+        try:
+            if len(texts) == 1:
+                return [self.translator.translate(texts[0], dest=dest).text]
+            # Send everything as one newline separated request; if the line
+            # structure doesn't survive, translate the strings one by one
+            if not any("\n" in text for text in texts):
+                lines = self.translator.translate("\n".join(texts), dest=dest).text.split("\n")
+                if len(lines) == len(texts):
+                    return [line.strip() for line in lines]
+            return [result.text for result in self.translator.translate(texts, dest=dest)]
+        except Exception as e:
+            print(f"Translation error: {e}")
+            return None
+
+
+class TranslatedText:
+    def __init__(self, text):
+        self.text = text
+
+
+class GoogleTranslateClient:
+    # Talks to Google's web translation endpoint through the shared
+    # transport. translate() takes the same arguments as googletrans and
+    # returns objects with a .text attribute, one per string for a list.
+    def __init__(self, url=TRANSLATE_URL, transport=None):
+        self.url = url
+        self.transport = transport or shared_transport()
+
+    def translate(self, text, dest='en', src='auto'):
+        if isinstance(text, list):
+            return [self.translate(item, dest, src) for item in text]
+        response = self.transport.get(self.url, {"client": "gtx", "sl": src, "tl": dest, "dt": "t", "q": text})
+        segments = json.loads(response.body)[0] or []
+        return TranslatedText("".join(segment[0] for segment in segments if segment and segment[0]))
+
+
+def placeholders(template):
+    try:
+        return {field for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+    except ValueError:
+        return None
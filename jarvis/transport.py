@@ -0,0 +1,212 @@
+import gzip
+import http.client
+import random
+import threading
+import time
+import urllib.parse
+
+USER_AGENT = "Jarvis voice assistant (https://github.com/Akash-437/Jarvis)"
+# Only requests that can safely be sent twice are retried
+IDEMPOTENT = {"GET", "HEAD"}
+
+
+class TransportError(Exception):
+    pass
+
+
+class CircuitOpenError(TransportError):
+    pass
+
+
+class HTTPStatusError(TransportError):
+    def __init__(self, status, url):
+        TransportError.__init__(self, f"HTTP {status} from {url}")
+        self.status = status
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class CircuitBreaker:
+    # Opens after failure_threshold consecutive failed requests to a host.
+    # While open every request fails at once; after reset_timeout a single
+    # trial request is let through, and its outcome closes or re-opens it.
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_running or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+
+class Transport:
+    # Shared HTTP client: keeps idle keep-alive connections per host, uses
+    # separate connect and read timeouts, retries failed GET and HEAD
+    # requests with jittered exponential backoff and puts a circuit breaker
+    # on each host.
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff=0.25, max_idle=4,
+                 failure_threshold=5, reset_timeout=30):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_idle = max_idle
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.idle = {}
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None):
+        if params:
+            url += ("&" if "?" in url else "?") + urllib.parse.urlencode(params)
+        return self.request("GET", url, headers=headers)
+
+    def request(self, method, url, body=None, headers=None):
+        parts = urllib.parse.urlsplit(url)
+        host = (parts.scheme, parts.hostname, parts.port)
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{parts.hostname} is unavailable, not retrying yet")
+
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip", **(headers or {})}
+
+        error = None
+        attempts = self.retries + 1 if method in IDEMPOTENT else 1
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            try:
+                response = self._send(host, method, path, body, headers)
+            except (OSError, http.client.HTTPException) as e:
+                error = e
+                continue
+            if response.status >= 500 or response.status == 429:
+                error = HTTPStatusError(response.status, url)
+                continue
+            breaker.record_success()
+            if response.status >= 400:
+                raise HTTPStatusError(response.status, url)
+            return response
+
+        breaker.record_failure()
+        if isinstance(error, TransportError):
+            raise error
+        raise TransportError(f"{method} {url} failed: {error}") from error
+
+    def breaker(self, host):
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def close(self):
+        with self.lock:
+            connections = [connection for pool in self.idle.values() for connection in pool]
+            self.idle.clear()
+        for connection in connections:
+            connection.close()
+
+    def _send(self, host, method, path, body, headers):
+        connection = self._acquire(host)
+        reused = connection.sock is not None
+        try:
+            return self._exchange(connection, method, path, body, headers)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            connection.close()
+            if not reused:
+                raise
+        except BaseException:
+            connection.close()
+            raise
+
+        # The server dropped an idle keep-alive connection; that's not a failure
+        connection = self._connect(host)
+        try:
+            return self._exchange(connection, method, path, body, headers)
+        except BaseException:
+            connection.close()
+            raise
+
+    def _exchange(self, connection, method, path, body, headers):
+        if connection.sock is None:
+            connection.connect()
+            connection.sock.settimeout(self.read_timeout)
+        connection.request(method, path, body=body, headers=headers)
+        raw = connection.getresponse()
+        data = raw.read()
+        if raw.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        response = Response(raw.status, dict(raw.getheaders()), data)
+        if raw.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        return response
+
+    def _acquire(self, host):
+        with self.lock:
+            pool = self.idle.get(host)
+            if pool:
+                return pool.pop()
+        return self._connect(host)
+
+    def _connect(self, host):
+        scheme, hostname, port = host
+        if scheme == "https":
+            connection = http.client.HTTPSConnection(hostname, port, timeout=self.connect_timeout)
+        else:
+            connection = http.client.HTTPConnection(hostname, port, timeout=self.connect_timeout)
+        connection.jarvis_host = host
+        return connection
+
+    def _release(self, connection):
+        with self.lock:
+            pool = self.idle.setdefault(connection.jarvis_host, [])
+            if len(pool) < self.max_idle:
+                pool.append(connection)
+                return
+        connection.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport():
+    # The one Transport every client uses unless it is given its own
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Transport()
+        return _shared
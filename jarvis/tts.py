@@ -0,0 +1,168 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from . import tracing
+from .audio_cache import AudioCache, WavPlayer
+from .gate import SpeakingTracker
+from .lazy import lazy_import
+from .speech_queue import BACKGROUND
+from .voices import VoiceIndex
+
+pyttsx3 = lazy_import("pyttsx3")
+
+
+class TextToSpeechThread(threading.Thread):
+    # Speaks the items of a SpeechQueue, one at a time, until the queue is
+    # closed. With switch_voices the voice follows the language of each item;
+    # otherwise the engine's default voice is used throughout. With
+    # cache_audio, phrases passed to prerender() and phrases said a second
+    # time are rendered to a .wav (once per voice and rate) whenever there
+    # is nothing to say, and played back from the audio cache after that.
+    # Anything not in the cache yet is spoken by the engine straight away.
+    # Barge-in on the queue cuts the current item short. speaking is told
+    # whenever speech is actually coming out of the speakers.
+    def __init__(self, speech_queue, switch_voices=True, gender=None, fallback=('en',), cache_audio=True,
+                 speaking=None):
+        threading.Thread.__init__(self, daemon=True)
+        self.speech_queue = speech_queue
+        self.switch_voices = switch_voices
+        self.gender = gender
+        self.fallback = fallback
+        self.cache_audio = cache_audio
+        self.audio_cache = None
+        self.player = None
+        self.engine_speaking = False
+        self.speaking = speaking or SpeakingTracker()
+        # Recently spoken phrases that aren't cached, to spot the ones that repeat
+        self.uncached = OrderedDict()
+        self.uncached_size = 256
+        self.lock = threading.Lock()
+
+    def run(self):
+        # The engine is started here rather than in __init__ so the window doesn't wait for it
+        self.engine = pyttsx3.init()
+        # Enumerating voices is slow on some drivers, so only do it once
+        if self.switch_voices:
+            self.voices = VoiceIndex(self.engine.getProperty('voices'), self.gender, self.fallback)
+        self.default_voice = self.engine.getProperty('voice')
+        self.current_voice = self.default_voice
+        if self.cache_audio:
+            try:
+                self.player = WavPlayer()
+                self.audio_cache = AudioCache()
+            except Exception as e:
+                print(f"Speech audio cache unavailable; {e}")
+                self.player = None
+        self.speech_queue.on_interrupt = self.interrupt
+
+        while True:
+            item = self.speech_queue.get()
+            if item is None:
+                return
+            try:
+                if item.render_only:
+                    self._prerender(item)
+                else:
+                    with tracing.bind(item.turn):
+                        tracing.record("tts_wait", time.monotonic() - item.queued)
+                        self.speak(item)
+            except Exception as e:
+                print(f"Could not say '{item.text}'; {e}")
+            finally:
+                self.speech_queue.task_done()
+
+    def prerender(self, texts, language):
+        # Safe to call from any thread
+        if self.cache_audio:
+            for text in texts:
+                self.speech_queue.put(text, language, priority=BACKGROUND, render_only=True)
+
+    def voice_for(self, language):
+        if self.switch_voices:
+            return self.voices.select(language) or self.default_voice
+        return self.default_voice
+
+    def speak(self, item):
+        voice = self.voice_for(item.language)
+        if self.audio_cache is not None:
+            try:
+                clip = self.audio_cache.get(self.audio_cache.key(item.text, voice, self.engine.getProperty('rate')))
+                if clip is not None:
+                    if not item.interrupted:
+                        tracing.responding(item.turn)
+                        with tracing.span("playback"), self.speaking.audible():
+                            self.player.play(clip, lambda: item.interrupted)
+                    return
+                self._seen(item)
+            except Exception as e:
+                print(f"Cached speech playback failed; {e}")
+        if item.interrupted:
+            return
+        self._use_voice(voice)
+        tracing.responding(item.turn)
+        with tracing.span("speak"), self.speaking.audible():
+            with self.lock:
+                self.engine_speaking = True
+            try:
+                self.engine.say(item.text)
+                self.engine.runAndWait()
+            finally:
+                with self.lock:
+                    self.engine_speaking = False
+
+    def interrupt(self):
+        # Called by the queue from whichever thread barged in. Cached clips
+        # check their item between chunks; the engine has to be told.
+        with self.lock:
+            if self.engine_speaking:
+                try:
+                    self.engine.stop()
+                except Exception as e:
+                    print(f"Could not interrupt speech; {e}")
+
+    def render(self, text, voice):
+        key = self.audio_cache.key(text, voice, self.engine.getProperty('rate'))
+        clip = self.audio_cache.get(key)
+        if clip is None:
+            self._use_voice(voice)
+            handle, path = tempfile.mkstemp(suffix=".wav", dir=self.audio_cache.directory)
+            os.close(handle)
+            try:
+                with tracing.span("synthesis"):
+                    self.engine.save_to_file(text, path)
+                    self.engine.runAndWait()
+                clip = self.audio_cache.store(key, path)
+            finally:
+                if os.path.exists(path):
+                    os.remove(path)
+        return clip
+
+    def stop(self):
+        self.speech_queue.close()
+
+    def _use_voice(self, voice):
+        if voice and voice != self.current_voice:
+            self.engine.setProperty('voice', voice)
+            self.current_voice = voice
+
+    def _seen(self, item):
+        # A phrase said a second time is worth rendering for the next one
+        key = (item.text, item.language)
+        if key in self.uncached:
+            del self.uncached[key]
+            self.prerender([item.text], item.language)
+            return
+        self.uncached[key] = True
+        while len(self.uncached) > self.uncached_size:
+            self.uncached.popitem(last=False)
+
+    def _prerender(self, item):
+        if self.audio_cache is None:
+            return
+        try:
+            self.render(item.text, self.voice_for(item.language))
+        except Exception as e:
+            print(f"Could not prerender '{item.text}'; {e}")
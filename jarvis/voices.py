@@ -0,0 +1,59 @@
+class VoiceIndex:
+    # Lookup table from language tag to installed pyttsx3 voices, built once
+    # per engine. select() walks a fallback chain: the exact language-region
+    # tag, the bare language, then each configured fallback language, and
+    # finally the engine's first voice.
+    def __init__(self, voices, gender=None, fallback=('en',)):
+        self.gender = gender
+        self.fallback = tuple(fallback)
+        self.default = voices[0].id if voices else None
+        self.by_language = {}
+        self.selected = {}
+        for voice in voices:
+            for tag in voice_languages(voice):
+                self.by_language.setdefault(tag, []).append(voice)
+                base = tag.split('-')[0]
+                if base != tag:
+                    self.by_language.setdefault(base, []).append(voice)
+
+    def select(self, language, gender=None):
+        gender = gender or self.gender
+        key = (language, gender)
+        if key not in self.selected:
+            self.selected[key] = self._find(normalize_tag(language), gender)
+        return self.selected[key]
+
+    def _find(self, tag, gender):
+        chain = [tag, tag.split('-')[0]] + list(self.fallback)
+        for candidate in chain:
+            voices = self.by_language.get(candidate)
+            if not voices:
+                continue
+            if gender:
+                for voice in voices:
+                    if voice_gender(voice) == gender:
+                        return voice.id
+            return voices[0].id
+        return self.default
+
+
+def voice_languages(voice):
+    # eSpeak reports languages as bytes with a leading priority byte, e.g. b'\x05en-us'
+    tags = []
+    for language in voice.languages or []:
+        if isinstance(language, bytes):
+            language = language.decode('utf-8', errors='ignore')
+        language = normalize_tag(language.lstrip(''.join(chr(c) for c in range(32))))
+        if language:
+            tags.append(language)
+    return tags
+
+
+def voice_gender(voice):
+    gender = (getattr(voice, 'gender', None) or '').lower()
+    # NSSpeechSynthesizer uses 'VoiceGenderFemale' and friends
+    return gender.replace('voicegender', '') or None
+
+
+def normalize_tag(language):
+    return language.strip().lower().replace('_', '-')
@@ -0,0 +1,82 @@
+import json
+
+from .transport import shared_transport
+
+API_URL = "https://{language}.wikipedia.org/w/api.php"
+
+
+class WikiError(Exception):
+    pass
+
+
+class PageError(WikiError):
+    def __init__(self, title):
+        WikiError.__init__(self, f"\"{title}\" does not match any pages")
+        self.title = title
+
+
+class DisambiguationError(WikiError):
+    def __init__(self, title, options):
+        WikiError.__init__(self, f"\"{title}\" may refer to: {', '.join(options)}")
+        self.title = title
+        self.options = options
+
+
+class SuggestedTitle(WikiError):
+    # Raised before any lookup when the query is only somewhat like a known title
+    def __init__(self, query, suggestion):
+        WikiError.__init__(self, f"\"{query}\" is not a title; did you mean \"{suggestion}\"?")
+        self.title = query
+        self.suggestion = suggestion
+
+
+class LookupCancelled(WikiError):
+    pass
+
+
+class WikiClient:
+    # Minimal MediaWiki API client. Unlike the wikipedia package it keeps no
+    # global language setting: every call names the wiki it goes to, so
+    # lookups in different languages can run at the same time.
+    def __init__(self, api_url=API_URL, transport=None):
+        self.api_url = api_url
+        self.transport = transport or shared_transport()
+
+    def summary(self, query, sentences=2, language='en', cancelled=None):
+        # Same behaviour as wikipedia.summary(): search for the best matching
+        # title, then return the first sentences of that article
+        title = self.search(query, language)
+        if cancelled is not None and cancelled.is_set():
+            raise LookupCancelled(query)
+        return self.extract(title, sentences, language)
+
+    def search(self, query, language='en'):
+        response = self._get(language, action="query", list="search", srsearch=query, srlimit=1,
+                             srinfo="suggestion", srprop="")
+        results = response.get("query", {}).get("search", [])
+        if results:
+            return results[0]["title"]
+        suggestion = response.get("query", {}).get("searchinfo", {}).get("suggestion")
+        if suggestion:
+            return suggestion
+        raise PageError(query)
+
+    def extract(self, title, sentences=2, language='en'):
+        response = self._get(language, action="query", prop="extracts|pageprops", ppprop="disambiguation",
+                             exintro=1, explaintext=1, exsentences=sentences, redirects=1, titles=title)
+        pages = response.get("query", {}).get("pages", [])
+        if not pages or pages[0].get("missing") or pages[0].get("invalid"):
+            raise PageError(title)
+        page = pages[0]
+        if "disambiguation" in page.get("pageprops", {}):
+            raise DisambiguationError(page["title"], self.links(page["title"], language))
+        return page.get("extract", "").strip()
+
+    def links(self, title, language='en'):
+        response = self._get(language, action="query", prop="links", plnamespace=0, pllimit="max", titles=title)
+        pages = response.get("query", {}).get("pages", [])
+        return [link["title"] for page in pages for link in page.get("links", [])]
+
+    def _get(self, language, **params):
+        params.update(format="json", formatversion=2)
+        return json.loads(self.transport.get(self.api_url.format(language=language), params).body)
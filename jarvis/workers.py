@@ -0,0 +1,143 @@
+# Process pool for the CPU-heavy stages of recognition: preprocessing and
+# encoding phrases, keyword spotting, local recognition engines and
+# langdetect. On threads these hold the GIL and starve the Tk loop and the
+# speech thread; in processes they scale with the number of cores. Phrases
+# reach the workers through shared memory rather than being pickled down a
+# pipe, and every worker loads its engine and models when it starts, not on
+# its first phrase.
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import get_context, shared_memory
+
+from .gate import KeywordSpotter
+from .language_id import detect_languages
+from .lazy import lazy_import
+from .preprocess import AudioPreprocessor
+from .recognizers import make_backend
+
+sr = lazy_import("speech_recognition")
+
+# Set up once in every worker process by start_worker()
+backend = None
+preprocessor = None
+spotters = {}
+startup_error = None
+
+
+def start_worker(language, compress, detect_language):
+    # An exception raised here would break the whole pool, so failures are
+    # only reported; the calls that need what is missing fail on their own
+    global backend, preprocessor, startup_error
+    try:
+        backend = make_backend(sr.Recognizer(), language)
+        preprocessor = AudioPreprocessor(backend.uploads_flac) if compress else None
+        backend.warm()
+    except Exception as e:
+        startup_error = e
+        print(f"Recognition worker couldn't load the recognizer; {e}")
+    if detect_language:
+        try:
+            # langdetect reads its language profiles on first use
+            detect_languages("warming up the language profiles")
+        except Exception as e:
+            print(f"Recognition worker couldn't load langdetect; {e}")
+
+
+def worker_ready():
+    return os.getpid()
+
+
+def read_shared(name, size, sample_rate, sample_width):
+    memory = shared_memory.SharedMemory(name)
+    try:
+        return sr.AudioData(bytes(memory.buf[:size]), sample_rate, sample_width)
+    finally:
+        memory.close()
+
+
+def recognize_in_worker(name, size, sample_rate, sample_width, threshold):
+    if backend is None:
+        raise sr.RequestError(f"the recognizer couldn't be set up; {startup_error}")
+    audio = read_shared(name, size, sample_rate, sample_width)
+    measurement = None
+    if preprocessor is not None:
+        audio = preprocessor.process(audio, threshold)
+        measurement = preprocessor.measurement
+    return backend.transcribe(audio), measurement
+
+
+def spot_in_worker(name, size, sample_rate, sample_width, keywords):
+    if keywords not in spotters:
+        spotters[keywords] = KeywordSpotter(keywords)
+    return spotters[keywords].spot(read_shared(name, size, sample_rate, sample_width))
+
+
+def detect_in_worker(text):
+    return detect_languages(text)
+
+
+class WorkerPool:
+    # processes defaults to one per core. Workers are started with "spawn":
+    # forking a process that runs Tk and audio threads is not safe.
+    def __init__(self, language="en-US", processes=None, compress=True, detect_language=False):
+        self.processes = processes or os.cpu_count()
+        self.initargs = (language, compress, detect_language)
+        self.lock = threading.Lock()
+        self.executor = self._start()
+
+    def _start(self):
+        executor = ProcessPoolExecutor(self.processes, mp_context=get_context("spawn"),
+                                       initializer=start_worker, initargs=self.initargs)
+        # Starts every worker now so their models are loaded before the first phrase
+        self.ready = [executor.submit(worker_ready) for _ in range(self.processes)]
+        return executor
+
+    def recognize(self, audio, threshold=None):
+        # Preprocesses (if the pool compresses) and transcribes a phrase in a
+        # worker. Returns the alternatives and the preprocessing measurement
+        # for AudioPreprocessor.record(), or None.
+        with shared(audio) as name:
+            return self._call(recognize_in_worker, name, len(audio.frame_data), audio.sample_rate,
+                              audio.sample_width, threshold)
+
+    def spot(self, audio, keywords):
+        # KeywordSpotter.spot() in a worker
+        with shared(audio) as name:
+            return self._call(spot_in_worker, name, len(audio.frame_data), audio.sample_rate,
+                              audio.sample_width, tuple(keywords))
+
+    def detect_languages(self, text):
+        return self._call(detect_in_worker, text)
+
+    def _call(self, fn, *args):
+        # A worker that dies breaks the whole executor; a fresh one is started
+        # so that only the calls running at the time fail
+        executor = self.executor
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool as e:
+            with self.lock:
+                if self.executor is executor:
+                    print(f"Recognition workers stopped, starting new ones; {e}")
+                    self.executor = self._start()
+            raise sr.RequestError(f"the recognition worker stopped; {e}")
+
+    def close(self):
+        with self.lock:
+            self.executor.shutdown(cancel_futures=True)
+
+
+@contextmanager
+def shared(audio):
+    # Copies the phrase into a shared memory block for as long as a worker needs it
+    size = len(audio.frame_data)
+    memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        memory.buf[:size] = audio.frame_data
+        yield memory.name
+    finally:
+        memory.close()
+        memory.unlink()